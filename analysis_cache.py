@@ -0,0 +1,175 @@
+import os
+import pickle
+import hashlib
+import threading
+from collections import OrderedDict
+import numpy as np
+
+# 缓存值格式版本：分析结果的结构或计算方式变化时递增，磁盘层的旧条目随之失效
+CACHE_VERSION = 1
+
+
+def content_key(image):
+    """生成图片内容的缓存键
+
+    路径使用 (绝对路径, 修改时间, 文件大小)，文件被替换后键随之改变；
+    字节串和数组使用内容哈希。无法确定内容的对象（如文件流）返回 None，
+    表示不缓存。
+    """
+    if isinstance(image, (str, os.PathLike)):
+        stat = os.stat(image)
+        return ('file', os.path.abspath(image), stat.st_mtime_ns, stat.st_size)
+    if isinstance(image, (bytes, bytearray, memoryview)):
+        return ('sha256', hashlib.sha256(image).hexdigest())
+    if isinstance(image, np.ndarray):
+        digest = hashlib.sha256(np.ascontiguousarray(image).data).hexdigest()
+        return ('array', digest, image.shape, str(image.dtype))
+    return None
+
+
+class AnalysisCache:
+    """按字节数限制大小的LRU分析结果缓存（线程安全）
+
+    可选的磁盘层保存在 disk_dir 下，进程重启后仍可命中。
+    """
+
+    def __init__(self, max_bytes=64 * 1024 * 1024, disk_dir=None, max_disk_bytes=512 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.disk_dir = disk_dir
+        self.max_disk_bytes = max_disk_bytes
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._disk_writes = 0
+        self.hits = 0
+        self.misses = 0
+
+        if disk_dir:
+            os.makedirs(disk_dir, exist_ok=True)
+
+    def get(self, key):
+        """读取缓存，未命中时返回 None"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return pickle.loads(entry)
+
+        data = self._read_disk(key)
+        if data is None:
+            with self._lock:
+                self.misses += 1
+            return None
+
+        # 磁盘命中后提升到内存层
+        with self._lock:
+            self.hits += 1
+            self._store(key, data)
+        return pickle.loads(data)
+
+    def put(self, key, value):
+        """写入缓存（值以pickle形式保存，按序列化后的字节数计算大小）"""
+        data = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        with self._lock:
+            self._store(key, data)
+        self._write_disk(key, data)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    @property
+    def size_bytes(self):
+        return self._bytes
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _store(self, key, data):
+        old = self._entries.pop(key, None)
+        if old is not None:
+            self._bytes -= len(old)
+
+        # 单个值超过上限时不放入内存层
+        if len(data) > self.max_bytes:
+            return
+
+        self._entries[key] = data
+        self._bytes += len(data)
+        while self._bytes > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self._bytes -= len(evicted)
+
+    def _disk_path(self, key):
+        digest = hashlib.sha256(repr((CACHE_VERSION, key)).encode('utf-8')).hexdigest()
+        return os.path.join(self.disk_dir, f"{digest}.pkl")
+
+    def _read_disk(self, key):
+        if not self.disk_dir:
+            return None
+        try:
+            with open(self._disk_path(key), 'rb') as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def _write_disk(self, key, data):
+        if not self.disk_dir:
+            return
+        path = self._disk_path(key)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp_path, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except OSError:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            return
+
+        # 定期清理最久未更新的磁盘缓存
+        with self._lock:
+            self._disk_writes += 1
+            trim = self._disk_writes % 64 == 0
+        if trim:
+            self._trim_disk()
+
+    def _trim_disk(self):
+        files = []
+        for entry in os.scandir(self.disk_dir):
+            if entry.name.endswith('.pkl'):
+                stat = entry.stat()
+                files.append((stat.st_mtime, stat.st_size, entry.path))
+
+        total = sum(size for _, size, _ in files)
+        for _, size, path in sorted(files):
+            if total <= self.max_disk_bytes:
+                break
+            try:
+                os.remove(path)
+                total -= size
+            except OSError:
+                pass
+
+
+_shared_cache = None
+_shared_lock = threading.Lock()
+
+
+def get_shared_cache():
+    """进程内共享的缓存实例（所有会话和分析器共用）"""
+    global _shared_cache
+    with _shared_lock:
+        if _shared_cache is None:
+            _shared_cache = AnalysisCache()
+        return _shared_cache
+
+
+def configure_shared_cache(max_bytes=64 * 1024 * 1024, disk_dir=None, max_disk_bytes=512 * 1024 * 1024):
+    """重新配置共享缓存（例如启用磁盘层）"""
+    global _shared_cache
+    with _shared_lock:
+        _shared_cache = AnalysisCache(max_bytes, disk_dir, max_disk_bytes)
+        return _shared_cache
@@ -0,0 +1,137 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+from analysis_store import AnalysisStore
+from database_setup import create_database
+from db_connection import get_database
+from metrics import timed
+
+# 按任务ID批量查询时每次的ID数量（低于SQLite的参数个数上限）
+QUERY_CHUNK = 500
+
+
+class AnalysisJobQueue:
+    """后台色彩分析任务队列
+
+    任务记录保存在 analysis_jobs 表，由进程内线程池执行，结果经
+    AnalysisStore 写入数据库。同一作品只有一个未完成的任务，重复提交
+    返回已有任务ID；页面重跑时只按任务ID读取进度，完成后直接读取已
+    存储的结果，不会重新计算。
+    """
+
+    def __init__(self, db_path='artwork_database.db', store=None, workers=2):
+        self.db_path = db_path
+        create_database(db_path)
+        self.db = get_database(db_path)
+        self.store = store or AnalysisStore(db_path)
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='analysis-job')
+        self._resume()
+
+    def _resume(self):
+        """上次进程退出时未完成的任务重新排队"""
+        def requeue(conn):
+            conn.execute('''
+                UPDATE analysis_jobs SET status = 'queued', started_at = NULL
+                WHERE status = 'running'
+            ''')
+            return conn.execute('''
+                SELECT job_id, artwork_id FROM analysis_jobs
+                WHERE status = 'queued' ORDER BY job_id
+            ''').fetchall()
+
+        for job_id, artwork_id in self.db.write(requeue):
+            self.executor.submit(self._run, job_id, artwork_id)
+
+    def submit(self, artwork_id):
+        """提交单件作品的分析任务，返回任务ID"""
+        return self.submit_many([artwork_id])[0]
+
+    def submit_many(self, artwork_ids):
+        """批量提交分析任务，返回与 artwork_ids 对应的任务ID列表
+
+        已有未完成任务的作品直接返回该任务的ID。
+        """
+        def enqueue(conn):
+            job_ids = []
+            created = []
+            for artwork_id in artwork_ids:
+                row = conn.execute('''
+                    SELECT job_id FROM analysis_jobs
+                    WHERE artwork_id = ? AND status IN ('queued', 'running')
+                ''', (artwork_id,)).fetchone()
+                if row is not None:
+                    job_ids.append(row[0])
+                    continue
+                job_id = conn.execute(
+                    'INSERT INTO analysis_jobs (artwork_id) VALUES (?)', (artwork_id,)
+                ).lastrowid
+                job_ids.append(job_id)
+                created.append((job_id, artwork_id))
+            return job_ids, created
+
+        job_ids, created = self.db.write(enqueue)
+        for job_id, artwork_id in created:
+            self.executor.submit(self._run, job_id, artwork_id)
+        return job_ids
+
+    def _run(self, job_id, artwork_id):
+        """在线程池中执行：分析作品并记录任务结果"""
+        status, error = 'failed', 'Interrupted'
+        try:
+            self.db.execute_write('''
+                UPDATE analysis_jobs SET status = 'running', started_at = CURRENT_TIMESTAMP
+                WHERE job_id = ?
+            ''', (job_id,))
+            _, rows = self.db.query(
+                'SELECT image_path, image_hash FROM artworks WHERE artwork_id = ?', (artwork_id,)
+            )
+            if not rows:
+                raise ValueError(f"Artwork not found: {artwork_id}")
+            image_path, image_hash = rows[0]
+            with timed('analysis_jobs.run'):
+                self.store.get_or_analyze(artwork_id, image_path, image_hash)
+            status, error = 'done', None
+        except Exception as e:
+            status, error = 'failed', str(e)
+        finally:
+            self._finish(job_id, status, error)
+
+    def _finish(self, job_id, status, error, attempts=3):
+        """记录任务结果；写入失败时重试，避免任务一直停留在 running 状态"""
+        for attempt in range(attempts):
+            try:
+                self.db.execute_write('''
+                    UPDATE analysis_jobs SET status = ?, error = ?, finished_at = CURRENT_TIMESTAMP
+                    WHERE job_id = ?
+                ''', (status, error, job_id))
+                return
+            except Exception as e:
+                print(f"Error finishing analysis job {job_id}: {e}")
+                time.sleep(0.5 * (attempt + 1))
+
+    def latest_job(self, artwork_id):
+        """作品最近一次的分析任务，没有时返回 None"""
+        columns, rows = self.db.query('''
+            SELECT job_id, artwork_id, status, error, created_at, started_at, finished_at
+            FROM analysis_jobs WHERE artwork_id = ?
+            ORDER BY job_id DESC LIMIT 1
+        ''', (artwork_id,))
+        return dict(zip(columns, rows[0])) if rows else None
+
+    def progress(self, job_ids):
+        """统计一组任务的进度，返回 (完成数, 失败数, 总数)"""
+        job_ids = list(dict.fromkeys(job_ids))
+        counts = {}
+        for start in range(0, len(job_ids), QUERY_CHUNK):
+            chunk = job_ids[start:start + QUERY_CHUNK]
+            _, rows = self.db.query(f'''
+                SELECT status, COUNT(*) FROM analysis_jobs
+                WHERE job_id IN ({', '.join('?' * len(chunk))})
+                GROUP BY status
+            ''', chunk)
+            for status, count in rows:
+                counts[status] = counts.get(status, 0) + count
+        return counts.get('done', 0), counts.get('failed', 0), len(job_ids)
+
+    def shutdown(self, wait=True):
+        self.executor.shutdown(wait=wait)
+
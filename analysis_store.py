@@ -0,0 +1,260 @@
+import os
+import json
+import hashlib
+from color_analyzer import ColorAnalyzer, ArtworkAnalysis
+from database_setup import create_database
+from db_connection import get_database
+from report_aggregates import update_analysis_aggregates
+from similarity_search import write_embedding, decode_embedding
+from color_index import write_color_index
+from canonical_arrays import ARRAY_DIR, load_canonical_array
+
+
+def compute_image_hash(image_path, chunk_size=1 << 20):
+    """计算图片文件内容的SHA-256哈希"""
+    sha256 = hashlib.sha256()
+    with open(image_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            sha256.update(chunk)
+    return sha256.hexdigest()
+
+
+class AnalysisStore:
+    """色彩分析结果存储（写穿透）
+
+    首次分析作品时将主要色彩、HSV分布直方图和心理映射写入
+    color_analysis / psychological_mappings 表，之后按作品ID和
+    图片内容哈希直接读取，不再重新处理像素。
+    """
+
+    def __init__(self, db_path='artwork_database.db', analyzer=None, array_dir=ARRAY_DIR):
+        self.db_path = db_path
+        self.analyzer = analyzer or ColorAnalyzer()
+        self.array_dir = array_dir
+
+        # 确保分析表存在（旧数据库可能缺少这些表）
+        create_database(db_path)
+        self.db = get_database(db_path)
+
+    def connect_db(self):
+        """当前线程共享的只读连接（写操作请通过 self.db.write 提交）"""
+        return self.db.read_connection()
+
+    def get_analysis(self, artwork_id, image_hash=None, image_path=None):
+        """读取作品的已存储分析结果，不存在或已过期时返回None
+
+        没有内容哈希的旧作品提供 image_path 时，按文件大小和修改时间判断是否过期。
+        """
+        row = self._fetch_latest(self.connect_db().cursor(), artwork_id=artwork_id)
+        if row is None:
+            return None
+        if image_hash is not None:
+            if row['image_hash'] != image_hash:
+                return None
+        elif image_path is not None:
+            try:
+                stat = os.stat(image_path)
+            except OSError:
+                return None
+            if row['image_size'] != stat.st_size or row['image_mtime'] != stat.st_mtime:
+                return None
+        return self._row_to_analysis(row)
+
+    def save_analysis(self, artwork_id, image_hash, analysis, image_size=None, image_mtime=None):
+        """保存分析结果（替换该作品之前的结果）"""
+        self.db.write(lambda conn: self._write_analysis(
+            conn.cursor(), artwork_id, image_hash, analysis, image_size, image_mtime
+        ))
+
+    def save_many(self, records):
+        """在一个事务中批量保存分析结果
+
+        records 中每项为 (artwork_id, image_hash, analysis, image_size, image_mtime)；
+        analysis 为 None 表示内容未变化，只刷新文件状态。
+        """
+        def write(conn):
+            cursor = conn.cursor()
+            for artwork_id, image_hash, analysis, image_size, image_mtime in records:
+                if analysis is None:
+                    cursor.execute('''
+                        UPDATE color_analysis SET image_size = ?, image_mtime = ?
+                        WHERE artwork_id = ? AND image_hash = ?
+                    ''', (image_size, image_mtime, artwork_id, image_hash))
+                else:
+                    self._write_analysis(
+                        cursor, artwork_id, image_hash, analysis, image_size, image_mtime
+                    )
+
+        self.db.write(write)
+
+    def list_pending(self):
+        """列出没有当前分析结果的作品
+
+        返回 (artwork_id, image_path, stored_hash, image_hash) 列表；stored_hash
+        为已存储结果的哈希（文件状态变化时需要重新核对），没有结果时为 None；
+        image_hash 为导入时记录的内容哈希，旧数据为 None。
+        """
+        _, rows = self.db.query('''
+            SELECT a.artwork_id, a.image_path, a.image_hash,
+                   ca.image_hash, ca.image_size, ca.image_mtime
+            FROM artworks a
+            LEFT JOIN color_analysis ca ON ca.artwork_id = a.artwork_id
+            ORDER BY a.artwork_id
+        ''')
+
+        pending = []
+        for artwork_id, image_path, image_hash, stored_hash, image_size, image_mtime in rows:
+            if image_hash is not None:
+                # 内容寻址的图片不会被修改，比较哈希即可
+                if stored_hash == image_hash:
+                    continue
+            elif stored_hash is not None:
+                try:
+                    stat = os.stat(image_path)
+                except OSError:
+                    stat = None
+                if (stat is not None and stat.st_size == image_size
+                        and stat.st_mtime == image_mtime):
+                    continue
+            pending.append((artwork_id, image_path, stored_hash, image_hash))
+        return pending
+
+    def get_analyses_by_hash(self, image_hashes):
+        """按图片内容哈希读取已有分析结果，返回 {哈希: ArtworkAnalysis}"""
+        cursor = self.connect_db().cursor()
+        analyses = {}
+        for image_hash in image_hashes:
+            row = self._fetch_latest(cursor, image_hash=image_hash)
+            if row is not None:
+                analyses[image_hash] = self._row_to_analysis(row)
+        return analyses
+
+    def analyze_image(self, image_path, image_hash=None):
+        """对图片执行完整的色彩分析
+
+        有导入时生成的标准数组时直接内存映射加载，不再解码原图。
+        """
+        array = load_canonical_array(image_hash, self.array_dir)
+        return self.analyzer.analyze(array if array is not None else image_path)
+
+    def get_or_analyze(self, artwork_id, image_path, image_hash=None):
+        """读取已存储的分析结果，没有或已过期时重新分析并写入
+
+        image_hash 为作品记录中的内容哈希；提供时直接按哈希判断，无需访问文件。
+        """
+        cursor = self.connect_db().cursor()
+        row = self._fetch_latest(cursor, artwork_id=artwork_id)
+
+        if (image_hash is not None and row is not None
+                and row['image_hash'] == image_hash):
+            return self._row_to_analysis(row)
+
+        stat = os.stat(image_path)
+        if image_hash is None:
+            # 文件大小和修改时间未变化时无需读取文件
+            if (row is not None and row['image_size'] == stat.st_size
+                    and row['image_mtime'] == stat.st_mtime):
+                return self._row_to_analysis(row)
+
+            image_hash = compute_image_hash(image_path)
+            if row is not None and row['image_hash'] == image_hash:
+                # 内容未变，仅刷新文件状态
+                self.db.execute_write('''
+                    UPDATE color_analysis SET image_size = ?, image_mtime = ?
+                    WHERE analysis_id = ?
+                ''', (stat.st_size, stat.st_mtime, row['analysis_id']))
+                return self._row_to_analysis(row)
+
+        # 相同内容的其他作品已有分析结果时直接复用
+        shared = self._fetch_latest(cursor, image_hash=image_hash)
+        if shared is not None:
+            analysis = self._row_to_analysis(shared)
+        else:
+            analysis = self.analyze_image(image_path, image_hash)
+        self.save_analysis(artwork_id, image_hash, analysis, stat.st_size, stat.st_mtime)
+        return analysis
+
+    def _fetch_latest(self, cursor, artwork_id=None, image_hash=None):
+        """按作品ID或图片哈希读取最新的分析结果"""
+        if artwork_id is not None:
+            condition, param = 'ca.artwork_id = ?', artwork_id
+        else:
+            condition, param = 'ca.image_hash = ?', image_hash
+        cursor.execute(f'''
+            SELECT
+                ca.analysis_id,
+                ca.image_hash,
+                ca.image_size,
+                ca.image_mtime,
+                ca.dominant_colors,
+                ca.color_distribution,
+                ca.color_combinations,
+                pm.emotional_indicators,
+                pm.personality_traits,
+                ce.histogram
+            FROM color_analysis ca
+            LEFT JOIN psychological_mappings pm
+                ON pm.artwork_id = ca.artwork_id AND pm.image_hash = ca.image_hash
+            LEFT JOIN color_embeddings ce
+                ON ce.artwork_id = ca.artwork_id AND ce.image_hash = ca.image_hash
+            WHERE {condition}
+            ORDER BY ca.analysis_id DESC
+            LIMIT 1
+        ''', (param,))
+        row = cursor.fetchone()
+        if row is None:
+            return None
+        columns = [desc[0] for desc in cursor.description]
+        return dict(zip(columns, row))
+
+    def _write_analysis(self, cursor, artwork_id, image_hash, analysis, image_size, image_mtime):
+        # 先扣除旧结果在统计汇总中的计数
+        update_analysis_aggregates(cursor, artwork_id, -1)
+        cursor.execute('DELETE FROM color_analysis WHERE artwork_id = ?', (artwork_id,))
+        cursor.execute('DELETE FROM psychological_mappings WHERE artwork_id = ?', (artwork_id,))
+
+        cursor.execute('''
+            INSERT INTO color_analysis (
+                artwork_id, image_hash, image_size, image_mtime,
+                dominant_colors, color_distribution, color_combinations
+            ) VALUES (?, ?, ?, ?, ?, ?, ?)
+        ''', (
+            artwork_id,
+            image_hash,
+            image_size,
+            image_mtime,
+            json.dumps(analysis.dominant_colors),
+            json.dumps(analysis.color_distribution),
+            json.dumps(analysis.color_combinations)
+        ))
+
+        cursor.execute('''
+            INSERT INTO psychological_mappings (
+                artwork_id, image_hash, emotional_indicators, personality_traits
+            ) VALUES (?, ?, ?, ?)
+        ''', (
+            artwork_id,
+            image_hash,
+            json.dumps(analysis.psychology['emotions'], ensure_ascii=False),
+            json.dumps(analysis.psychology['traits'], ensure_ascii=False)
+        ))
+
+        write_embedding(
+            cursor, artwork_id, image_hash, analysis.dominant_colors, analysis.embedding
+        )
+        write_color_index(cursor, artwork_id, analysis.dominant_colors)
+
+        update_analysis_aggregates(cursor, artwork_id, 1)
+
+    @staticmethod
+    def _row_to_analysis(row):
+        return ArtworkAnalysis.from_dict({
+            'dominant_colors': json.loads(row['dominant_colors']),
+            'color_distribution': json.loads(row['color_distribution']),
+            'color_combinations': json.loads(row['color_combinations']),
+            'psychology': {
+                'emotions': json.loads(row['emotional_indicators'] or '[]'),
+                'traits': json.loads(row['personality_traits'] or '[]')
+            },
+            'embedding': decode_embedding(row['histogram']) if row['histogram'] else None
+        })
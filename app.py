@@ -1,17 +1,66 @@
 import streamlit as st
-import pandas as pd
-from PIL import Image
 import os
 from datetime import datetime
 from data_importer import ArtworkImporter
-from color_analyzer import ColorAnalyzer
-import plotly.express as px
-import plotly.graph_objects as go
+from analysis_store import AnalysisStore
+from analysis_cache import configure_shared_cache
+from report_aggregates import ReportAggregates
+from similarity_search import SimilarityIndex
+from color_index import ColorIndex, all_buckets, bucket_label
+from association_mining import AssociationMiner, ITEM_CATEGORIES
+from color_pattern_model import ColorPatternModel, MODEL_DIR, latest_model_info
+from color_analyzer import BASE_COLOR_NAMES, BASE_COLOR_RGB
 from psychological_analyzer import PsychologicalAnalyzer
+from metrics import REGISTRY, timed
+from analysis_jobs import AnalysisJobQueue
+
+# pandas 和 plotly 只在用到的页面中导入，数据录入页面启动时不加载
+
+# 设置 ARTWORK_SHOW_METRICS=1 时在侧边栏显示“性能”页面
+SHOW_METRICS = os.environ.get('ARTWORK_SHOW_METRICS', '') not in ('', '0')
+
+@st.cache_resource
+def get_analysis_store(db_path):
+    """进程内共享的分析存储，跨会话和页面重跑复用"""
+    # 启用磁盘缓存层，重启后仍可命中
+    configure_shared_cache(disk_dir='data/color_analysis/cache')
+    return AnalysisStore(db_path)
+
+@st.cache_resource
+def get_job_queue(db_path):
+    """进程内共享的后台分析任务队列（线程池随应用进程存在，不随页面重跑）"""
+    return AnalysisJobQueue(db_path, store=get_analysis_store(db_path))
+
+@st.cache_resource
+def get_pattern_model(model_dir, version):
+    """加载指定版本的色彩模式模型（版本变化时重新加载）
+
+    模型文件损坏或格式不兼容时返回 None，页面退化为按基础色彩分组。
+    """
+    try:
+        return ColorPatternModel.load(model_dir, version)
+    except Exception as e:
+        print(f"加载色彩模式模型失败: {e}")
+        return None
+
+@st.cache_resource
+def get_similarity_index(db_path):
+    """进程内共享的相似作品索引（嵌入矩阵只加载一次）"""
+    return SimilarityIndex(db_path)
 
 class ArtworkAnalysisUI:
+    # 作品浏览每页显示的作品数（默认值和可选值）
+    GALLERY_PAGE_SIZE = 12
+    GALLERY_PAGE_SIZES = [6, 12, 24, 48]
+    
     def __init__(self):
         self.importer = ArtworkImporter()
+        self.store = get_analysis_store(self.importer.db_path)
+        self.jobs = get_job_queue(self.importer.db_path)
+        self.aggregates = ReportAggregates(self.importer.db_path)
+        self.similarity_index = get_similarity_index(self.importer.db_path)
+        self.color_index = ColorIndex(self.importer.db_path)
+        self.miner = AssociationMiner(self.importer.db_path)
         
     def setup_page(self):
         st.set_page_config(
@@ -23,10 +72,16 @@ class ArtworkAnalysisUI:
         
     def show_sidebar(self):
         st.sidebar.title("功能导航")
-        return st.sidebar.radio(
-            "选择功能:",
-            ["数据录入", "作品查看", "数据分析", "心理映射", "统计报告"]
-        )
+        pages = ["数据录入", "作品查看", "数据分析", "心理映射", "统计报告"]
+        if SHOW_METRICS:
+            pages.append("性能")
+        return st.sidebar.radio("选择功能:", pages)
+    
+    @staticmethod
+    def _plotly_chart(fig, **kwargs):
+        """显示 plotly 图表（计入图表序列化耗时）"""
+        with timed('ui.plotly_chart'):
+            st.plotly_chart(fig, **kwargs)
         
     def data_input_page(self):
         st.header("数据录入")
@@ -69,49 +124,25 @@ class ArtworkAnalysisUI:
         uploaded_file = st.file_uploader("选择图片文件", type=['png', 'jpg', 'jpeg'])
         
         if uploaded_file is not None:
+            # 预览直接使用上传的原始字节，导入时也直接读取上传内容，不写临时文件
             try:
-                # 创建临时目录
-                temp_dir = "temp"
-                os.makedirs(temp_dir, exist_ok=True)
-                
-                # 显示预览图
-                image = Image.open(uploaded_file)
-                st.image(image, caption="作品预览", use_container_width=True)
-                
-                # 保存临时文件
-                temp_path = os.path.join(temp_dir, f"temp_{datetime.now().strftime('%Y%m%d_%H%M%S')}.jpg")
-                
-                # 确保图片是RGB模式
-                if image.mode != 'RGB':
-                    image = image.convert('RGB')
-                
-                # 保存图片
-                image.save(temp_path, format='JPEG', quality=95)
-                
-                if st.button("提交数据"):
-                    try:
-                        # 导入数据
-                        result = self.importer.import_complete_record(
-                            child_data,
-                            artwork_data,
-                            temp_path
-                        )
-                        
-                        if result['success']:
-                            st.success("数据导入成功！")
-                            st.json(result)
-                        else:
-                            st.error(f"导入失败: {result['error']}")
-                            
-                    finally:
-                        # 清理临时文件
-                        if os.path.exists(temp_path):
-                            os.remove(temp_path)
-                    
+                st.image(uploaded_file, caption="作品预览", use_container_width=True)
             except Exception as e:
                 st.error(f"处理图片时出错: {str(e)}")
-                if 'temp_path' in locals() and os.path.exists(temp_path):
-                    os.remove(temp_path)
+                return
+            
+            if st.button("提交数据"):
+                result = self.importer.import_complete_record(
+                    child_data,
+                    artwork_data,
+                    uploaded_file
+                )
+                
+                if result['success']:
+                    st.success("数据导入成功！")
+                    st.json(result)
+                else:
+                    st.error(f"导入失败: {result['error']}")
     
     def view_artwork_page(self):
         st.header("作品浏览")
@@ -132,36 +163,83 @@ class ArtworkAnalysisUI:
                 location = st.text_input("地域")
                 
             with col3:
+                filter_by_date = st.checkbox("按创作日期筛选")
                 date_range = st.date_input(
                     "创作日期范围",
-                    value=[datetime.now().date(), datetime.now().date()]
+                    value=[datetime.now().date(), datetime.now().date()],
+                    disabled=not filter_by_date
                 )
                 education = st.multiselect(
                     "教育环境",
                     ["公立幼儿园", "私立幼儿园", "其他"]
                 )
+            
+            col1, col2 = st.columns(2)
+            with col1:
+                color_bucket = st.selectbox(
+                    "主要色彩",
+                    [None] + all_buckets(),
+                    format_func=lambda bucket: "不限" if bucket is None else bucket_label(bucket)
+                )
+            with col2:
+                min_coverage = st.slider(
+                    "色彩最低占比（%）", 0, 100, 30, step=5, disabled=color_bucket is None
+                )
         
-        # 获取作品数据
-        artworks = self.importer.get_all_artworks()
+        filters = {
+            'age_range': age_range,
+            'gender': gender,
+            'medium': medium,
+            'location': location.strip(),
+            'education_setting': education
+        }
+        if filter_by_date and len(date_range) == 2:
+            filters['date_range'] = tuple(date_range)
+        if color_bucket is not None:
+            filters['color'] = (color_bucket, min_coverage / 100)
+        
+        page_size = st.selectbox(
+            "每页显示",
+            self.GALLERY_PAGE_SIZES,
+            index=self.GALLERY_PAGE_SIZES.index(self.GALLERY_PAGE_SIZE)
+        )
+        
+        # 筛选条件或每页数量变化时回到第一页
+        filter_key = repr((sorted(filters.items()), page_size))
+        if st.session_state.get('gallery_filter_key') != filter_key:
+            st.session_state.gallery_filter_key = filter_key
+            st.session_state.gallery_cursors = [None]
+        cursors = st.session_state.gallery_cursors
+        
+        # 获取当前页作品数据
+        artworks, next_cursor = self.importer.get_artworks_page(
+            filters,
+            page_size=page_size,
+            after_id=cursors[-1]
+        )
         
         if not artworks:
             st.info("暂无作品数据")
             return
         
+        self._gallery_pagination(cursors, next_cursor, key_prefix='top')
+        
         # 显示作品网格
         cols = st.columns(3)
         for idx, artwork in enumerate(artworks):
             with cols[idx % 3]:
                 try:
-                    # 显示图片
+                    # 显示缩略图，原图只在查看详情时加载
                     if os.path.exists(artwork['image_path']):
-                        image = Image.open(artwork['image_path'])
-                        st.image(image, use_container_width=True)
+                        st.image(self.importer.ensure_thumbnail(artwork), use_container_width=True)
                     else:
                         st.error("图片文件不存在")
                     
                     # 显示作品信息
                     with st.expander("作品详情"):
+                        if st.checkbox("查看原图", key=f"original_{artwork['artwork_id']}"):
+                            st.image(artwork['image_path'], use_container_width=True)
+                        
                         st.write(f"创作日期: {artwork['creation_date']}")
                         st.write(f"创作媒介: {artwork['medium']}")
                         st.write(f"作品主题: {artwork['artwork_theme']}")
@@ -172,12 +250,30 @@ class ArtworkAnalysisUI:
                         
                         # 添加分析按钮
                         if st.button(f"分析作品 #{artwork['artwork_id']}", key=f"analyze_{artwork['artwork_id']}"):
+                            # 先提交后台任务，切换页面时分析已经开始
+                            self.jobs.submit(artwork['artwork_id'])
                             st.session_state.selected_artwork = artwork
                             st.session_state.page = "数据分析"
                             st.rerun()
                             
                 except Exception as e:
                     st.error(f"显示作品出错: {e}")
+        
+        self._gallery_pagination(cursors, next_cursor, key_prefix='bottom')
+    
+    def _gallery_pagination(self, cursors, next_cursor, key_prefix):
+        """作品浏览的翻页按钮（cursors 保存每一页的起始游标）"""
+        col1, col2, col3 = st.columns([1, 2, 1])
+        with col1:
+            if st.button("上一页", key=f"{key_prefix}_prev", disabled=len(cursors) <= 1):
+                cursors.pop()
+                st.rerun()
+        with col2:
+            st.caption(f"第 {len(cursors)} 页")
+        with col3:
+            if st.button("下一页", key=f"{key_prefix}_next", disabled=next_cursor is None):
+                cursors.append(next_cursor)
+                st.rerun()
     
     def analysis_page(self):
         st.header("数据分析")
@@ -188,20 +284,22 @@ class ArtworkAnalysisUI:
         
         artwork = st.session_state.selected_artwork
         
-        # 创建分析器实例
-        analyzer = ColorAnalyzer()
-        
         # 显示原始图片
         if os.path.exists(artwork['image_path']):
-            image = Image.open(artwork['image_path'])
-            st.image(image, caption="原始作品", use_container_width=True)
+            # 直接传入路径，由Streamlit发送原文件，服务端不再解码
+            st.image(artwork['image_path'], caption="原始作品", use_container_width=True)
+            
+            # 读取已存储的分析结果（没有时在后台分析）
+            analysis = self._stored_or_queued_analysis(artwork)
+            if analysis is None:
+                return
             
             # 分析色彩
             col1, col2 = st.columns(2)
             
             with col1:
                 st.subheader("主要色彩分析")
-                dominant_colors = analyzer.extract_dominant_colors(artwork['image_path'])
+                dominant_colors = analysis.dominant_colors
                 
                 # 显示色彩比例
                 for color, percentage in dominant_colors:
@@ -212,10 +310,19 @@ class ArtworkAnalysisUI:
                         unsafe_allow_html=True
                     )
                     st.write(f"比例: {percentage*100:.1f}%")
+                
+                # 量化后的色彩桶（与作品浏览中的色彩筛选一致）
+                buckets = [
+                    f"{bucket_label(bucket)} {coverage*100:.0f}%"
+                    for bucket, coverage in self.color_index.artwork_buckets(artwork['artwork_id'])
+                    if '-' in bucket
+                ]
+                if buckets:
+                    st.caption("色彩桶: " + "、".join(buckets))
             
             with col2:
                 st.subheader("色彩心理分析")
-                psychology = analyzer.analyze_color_psychology(dominant_colors)
+                psychology = analysis.psychology
                 
                 st.write("情绪特征:")
                 for emotion, weight in psychology['emotions']:
@@ -227,22 +334,119 @@ class ArtworkAnalysisUI:
             
             # 显示分布图
             st.subheader("色彩分布可视化")
-            fig = analyzer.generate_visualization(artwork['image_path'])
-            st.plotly_chart(fig, use_container_width=True)
+            fig = analysis.figure()
+            self._plotly_chart(fig, use_container_width=True)
             
             # 分析报告
             st.subheader("分析报告")
-            distribution = analyzer.analyze_color_distribution(artwork['image_path'])
+            distribution = analysis.color_distribution
+            
+            # 使用plotly绘制分布图（直接使用预先分箱的直方图数据）
+            chart_cols = st.columns(3)
+            charts = [
+                ('hue_distribution', '色相分布直方图', '色相（度）'),
+                ('saturation_distribution', '饱和度分布直方图', '饱和度（%）'),
+                ('value_distribution', '明度分布直方图', '明度（%）')
+            ]
+            for col, (key, title, axis_title) in zip(chart_cols, charts):
+                if key in distribution:
+                    with col:
+                        fig = self._histogram_figure(distribution[key], title, axis_title)
+                        self._plotly_chart(fig, use_container_width=True)
+            
+            summary = distribution.get('summary')
+            if summary:
+                col1, col2, col3 = st.columns(3)
+                col1.metric("平均色相", f"{summary['hue_circular_mean']:.0f}°")
+                col1.metric("色相熵", f"{summary['hue_entropy']:.2f} bit")
+                col2.metric("平均饱和度", f"{summary['saturation_mean']:.1f}%")
+                col2.metric("饱和度标准差", f"{summary['saturation_std']:.1f}")
+                col3.metric("平均明度", f"{summary['value_mean']:.1f}%")
+                col3.metric("明度标准差", f"{summary['value_std']:.1f}")
             
-            # 使用plotly绘制分布图
-            fig = go.Figure()
-            fig.add_trace(go.Histogram(x=distribution['hue_distribution'], name='色相分布'))
-            fig.update_layout(title="色相分布直方图")
-            st.plotly_chart(fig, use_container_width=True)
+            self._similar_artworks_panel(artwork)
             
         else:
             st.error("无法加载图片文件")
     
+    def _stored_or_queued_analysis(self, artwork):
+        """读取已存储的分析结果；没有时提交后台任务并显示进度，返回 None"""
+        analysis = self.store.get_analysis(
+            artwork['artwork_id'], artwork.get('image_hash'), artwork.get('image_path')
+        )
+        if analysis is not None:
+            return analysis
+        
+        job = self.jobs.latest_job(artwork['artwork_id'])
+        if job is not None and job['status'] == 'failed':
+            st.error(f"分析失败: {job['error']}")
+            if not st.button("重新分析"):
+                return None
+        
+        job_id = self.jobs.submit(artwork['artwork_id'])
+        self._job_progress([job_id], "正在后台分析作品")
+        return None
+    
+    def _job_progress(self, job_ids, label, state_key=None):
+        """显示后台任务进度，全部结束后清除 state_key 并重跑页面读取结果
+        
+        支持 st.fragment 的 Streamlit 版本每秒只刷新进度条，其余版本
+        显示刷新按钮。
+        """
+        def show():
+            done, failed, total = self.jobs.progress(job_ids)
+            finished = done + failed
+            text = f"{label}：{finished} / {total}" + (f"（失败 {failed}）" if failed else "")
+            st.progress(finished / total if total else 1.0, text=text)
+            if finished == total:
+                if state_key:
+                    st.session_state.pop(state_key, None)
+                st.rerun()
+        
+        fragment = getattr(st, 'fragment', None)
+        if fragment is not None:
+            fragment(run_every=1)(show)()
+        else:
+            show()
+            st.button("刷新进度")
+    
+    def _similar_artworks_panel(self, artwork, k=6):
+        """显示色彩相似的作品"""
+        st.subheader("色彩相似的作品")
+        
+        results = self.similarity_index.search(artwork['artwork_id'], k=k)
+        if not results:
+            st.info("暂无可比较的作品（运行 python batch_analyzer.py 分析更多作品）")
+            return
+        
+        similarities = dict(results)
+        similar = self.importer.get_artworks_by_ids([artwork_id for artwork_id, _ in results])
+        cols = st.columns(len(similar) or 1)
+        for col, item in zip(cols, similar):
+            with col:
+                image_path = item.get('thumbnail_path') or item['image_path']
+                if os.path.exists(image_path):
+                    st.image(image_path, use_container_width=True)
+                st.caption(
+                    f"作品 #{item['artwork_id']} · 相似度 {similarities[item['artwork_id']]*100:.0f}%"
+                )
+                if st.button("分析此作品", key=f"similar_{item['artwork_id']}"):
+                    st.session_state.selected_artwork = item
+                    st.rerun()
+    
+    @staticmethod
+    def _histogram_figure(histogram, title, axis_title):
+        """根据分箱计数绘制直方图"""
+        import plotly.graph_objects as go
+        edges = histogram['bin_edges']
+        fig = go.Figure(data=[go.Bar(
+            x=[(start + end) / 2 for start, end in zip(edges[:-1], edges[1:])],
+            y=histogram['counts'],
+            width=edges[1] - edges[0]
+        )])
+        fig.update_layout(title=title, xaxis_title=axis_title, bargap=0)
+        return fig
+    
     def psychological_mapping_page(self):
         st.header("心理映射解读")
         
@@ -252,17 +456,23 @@ class ArtworkAnalysisUI:
         
         artwork = st.session_state.selected_artwork
         
-        # 创建分析器实例
-        color_analyzer = ColorAnalyzer()
-        psych_analyzer = PsychologicalAnalyzer()
+        # 创建分析器实例（使用离线拟合的色彩模式模型，页面只做预测）
+        model_info = latest_model_info(MODEL_DIR)
+        pattern_model = get_pattern_model(MODEL_DIR, model_info['version']) if model_info else None
+        psych_analyzer = PsychologicalAnalyzer(pattern_model)
+        if pattern_model is None:
+            st.caption("尚未拟合色彩模式模型，按基础色彩分组（运行 python color_pattern_model.py 拟合）")
         
         if os.path.exists(artwork['image_path']):
             # 显示原始图片
-            image = Image.open(artwork['image_path'])
-            st.image(image, caption="分析作品", use_container_width=True)
+            # 直接传入路径，由Streamlit发送原文件，服务端不再解码
+            st.image(artwork['image_path'], caption="分析作品", use_container_width=True)
             
             # 获取色彩数据
-            dominant_colors = color_analyzer.extract_dominant_colors(artwork['image_path'])
+            analysis = self._stored_or_queued_analysis(artwork)
+            if analysis is None:
+                return
+            dominant_colors = analysis.dominant_colors
             
             # 分析色彩模式
             color_patterns = psych_analyzer.analyze_color_patterns(dominant_colors)
@@ -321,136 +531,115 @@ class ArtworkAnalysisUI:
             st.error("无法加载图片文件")
     
     def report_page(self):
+        import pandas as pd
+        import plotly.express as px
+        import plotly.graph_objects as go
+        
         st.header("统计报告")
         
-        # 获取所有作品数据
-        artworks = self.importer.get_all_artworks()
+        # 读取增量维护的汇总计数
+        report = self.aggregates.get_report()
+        total_artworks = report.get('total', {}).get('', 0)
         
-        if not artworks:
+        if not total_artworks:
             st.info("暂无数据可供分析")
             return
         
-        # 创建分析器实例
-        analyzer = ColorAnalyzer()
-        
         # 1. 基础统计
         st.subheader("1. 基础统计信息")
         col1, col2, col3 = st.columns(3)
         
         with col1:
-            st.metric("作品总数", len(artworks))
+            st.metric("作品总数", total_artworks)
             
             # 性别分布
-            gender_counts = {}
-            for artwork in artworks:
-                gender = artwork['gender']
-                gender_counts[gender] = gender_counts.get(gender, 0) + 1
-            
+            gender_counts = report.get('gender', {})
             fig_gender = go.Figure(data=[go.Pie(
                 labels=list(gender_counts.keys()),
                 values=list(gender_counts.values()),
                 hole=.3
             )])
             fig_gender.update_layout(title="性别分布")
-            st.plotly_chart(fig_gender, use_container_width=True)
+            self._plotly_chart(fig_gender, use_container_width=True)
         
         with col2:
             # 年龄分布
-            ages = [artwork['age'] for artwork in artworks]
-            fig_age = go.Figure(data=[go.Histogram(x=ages, nbinsx=6)])
+            age_counts = {
+                int(age): count for age, count in report.get('age', {}).items() if age.isdigit()
+            }
+            ages = sorted(age_counts)
+            fig_age = go.Figure(data=[go.Bar(x=ages, y=[age_counts[age] for age in ages])])
             fig_age.update_layout(title="年龄分布")
-            st.plotly_chart(fig_age, use_container_width=True)
+            self._plotly_chart(fig_age, use_container_width=True)
         
         with col3:
             # 教育环境分布
-            education_counts = {}
-            for artwork in artworks:
-                edu = artwork['education_setting']
-                education_counts[edu] = education_counts.get(edu, 0) + 1
-            
+            education_counts = report.get('education_setting', {})
             fig_edu = go.Figure(data=[go.Pie(
                 labels=list(education_counts.keys()),
                 values=list(education_counts.values()),
                 hole=.3
             )])
             fig_edu.update_layout(title="教育环境分布")
-            st.plotly_chart(fig_edu, use_container_width=True)
+            self._plotly_chart(fig_edu, use_container_width=True)
         
         # 2. 色彩分析统计
         st.subheader("2. 色彩分析统计")
         
-        # 收集所有作品的色彩数据
-        all_colors = []
-        color_emotions = []
-        color_traits = []
-        
-        for artwork in artworks:
-            if os.path.exists(artwork['image_path']):
-                # 提取主要色彩
-                dominant_colors = analyzer.extract_dominant_colors(artwork['image_path'])
-                all_colors.extend([color for color, _ in dominant_colors])
-                
-                # 分析色彩心理
-                psychology = analyzer.analyze_color_psychology(dominant_colors)
-                color_emotions.extend([emotion for emotion, _ in psychology['emotions']])
-                color_traits.extend([trait for trait, _ in psychology['traits']])
+        analyzed = report.get('analyzed', {}).get('', 0)
+        if analyzed < total_artworks:
+            st.caption(
+                f"已分析 {analyzed} / {total_artworks} 件作品，"
+                f"可在后台分析其余作品（大量作品建议运行 python batch_analyzer.py）"
+            )
+            job_ids = st.session_state.get('report_analysis_jobs')
+            if job_ids:
+                self._job_progress(job_ids, "后台分析", state_key='report_analysis_jobs')
+            elif st.button("后台分析其余作品"):
+                pending = self.store.list_pending()
+                if pending:
+                    st.session_state.report_analysis_jobs = self.jobs.submit_many(
+                        [artwork_id for artwork_id, _, _, _ in pending]
+                    )
+                st.rerun()
+        else:
+            st.session_state.pop('report_analysis_jobs', None)
         
         col1, col2 = st.columns(2)
         
         with col1:
-            # 主要色彩使用频率
-            color_counts = {}
-            for color in all_colors:
-                color_counts[color] = color_counts.get(color, 0) + 1
-            
+            # 基础色彩使用频率
+            color_counts = report.get('base_color', {})
+            colors = [name for name in BASE_COLOR_NAMES if name in color_counts]
             fig_colors = go.Figure(data=[go.Bar(
-                x=list(color_counts.keys()),
-                y=list(color_counts.values()),
-                marker_color=list(color_counts.keys())
+                x=colors,
+                y=[color_counts[name] for name in colors],
+                marker_color=[
+                    'rgb({}, {}, {})'.format(*BASE_COLOR_RGB[BASE_COLOR_NAMES.index(name)])
+                    for name in colors
+                ]
             )])
             fig_colors.update_layout(title="主要色彩使用频率")
-            st.plotly_chart(fig_colors, use_container_width=True)
+            self._plotly_chart(fig_colors, use_container_width=True)
         
         with col2:
             # 情绪特征分布
-            emotion_counts = {}
-            for emotion in color_emotions:
-                emotion_counts[emotion] = emotion_counts.get(emotion, 0) + 1
-            
+            emotion_counts = report.get('emotion', {})
             fig_emotions = go.Figure(data=[go.Bar(
                 x=list(emotion_counts.keys()),
                 y=list(emotion_counts.values())
             )])
             fig_emotions.update_layout(title="情绪特征分布")
-            st.plotly_chart(fig_emotions, use_container_width=True)
+            self._plotly_chart(fig_emotions, use_container_width=True)
         
         # 3. 创作环境分析
         st.subheader("3. 创作环境分析")
         
         # 按环境分组的色彩使用
-        env_colors = {}
-        for artwork in artworks:
-            env = artwork['education_setting']
-            if env not in env_colors:
-                env_colors[env] = []
-            
-            if os.path.exists(artwork['image_path']):
-                dominant_colors = analyzer.extract_dominant_colors(artwork['image_path'])
-                env_colors[env].extend([color for color, _ in dominant_colors])
-        
-        # 创建环境-色彩分布图
-        env_color_data = []
-        for env, colors in env_colors.items():
-            color_counts = {}
-            for color in colors:
-                color_counts[color] = color_counts.get(color, 0) + 1
-            
-            for color, count in color_counts.items():
-                env_color_data.append({
-                    'environment': env,
-                    'color': color,
-                    'count': count
-                })
+        env_color_data = [
+            {'environment': env, 'color': color, 'count': count}
+            for (env, color), count in report.get('education_base_color', {}).items()
+        ]
         
         if env_color_data:
             df = pd.DataFrame(env_color_data)
@@ -461,24 +650,26 @@ class ArtworkAnalysisUI:
                 color='color',
                 title="不同教育环境下的色彩使用"
             )
-            st.plotly_chart(fig_env_colors, use_container_width=True)
+            self._plotly_chart(fig_env_colors, use_container_width=True)
         
         # 4. 时间趋势分析
         st.subheader("4. 时间趋势分析")
         
-        # 按时间排序的作品数量
-        artwork_dates = [artwork['creation_date'] for artwork in artworks]
-        fig_timeline = go.Figure(data=[go.Histogram(x=artwork_dates)])
+        # 按月统计的作品数量
+        month_counts = report.get('month', {})
+        months = sorted(month_counts)
+        fig_timeline = go.Figure(data=[go.Bar(x=months, y=[month_counts[m] for m in months])])
         fig_timeline.update_layout(title="作品创作时间分布")
-        st.plotly_chart(fig_timeline, use_container_width=True)
+        self._plotly_chart(fig_timeline, use_container_width=True)
         
         # 5. 综合分析报告
         st.subheader("5. 综合分析报告")
         
         # 计算一些关键指标
-        total_artworks = len(artworks)
-        avg_age = sum(ages) / len(ages) if ages else 0
+        age_total = sum(age_counts.values())
+        avg_age = sum(age * count for age, count in age_counts.items()) / age_total if age_total else 0
         most_common_emotion = max(emotion_counts.items(), key=lambda x: x[1])[0] if emotion_counts else "无"
+        top_colors = sorted(color_counts, key=color_counts.get, reverse=True)[:3]
         
         st.write(f"""
         ### 主要发现：
@@ -489,7 +680,7 @@ class ArtworkAnalysisUI:
         - 最常见的情绪表达是 "{most_common_emotion}"
         
         2. 色彩使用特点
-        - 主要使用的��彩为 {", ".join(list(color_counts.keys())[:3])}
+        - 主要使用的色彩为 {", ".join(top_colors)}
         - 色彩情绪表达多样，包含 {len(emotion_counts)} 种不同情绪
         
         3. 教育环境影响
@@ -501,21 +692,108 @@ class ArtworkAnalysisUI:
         - 建议关注色彩使用与情绪表达的关联
         - 可以进一步研究教育环境对创作的影响
         """)
+        
+        # 6. 关联规则
+        st.subheader("6. 色彩关联规则")
+        self._association_rules_section()
+    
+    def _association_rules_section(self):
+        """显示最近一次离线挖掘的关联规则（页面只读取已保存的结果）"""
+        import pandas as pd
+        run = self.miner.latest_run()
+        if run is None:
+            st.info("尚未挖掘关联规则（运行 python association_mining.py）")
+            return
+        
+        st.caption(
+            f"基于 {run['n_transactions']} 件作品，最小支持度 {run['params']['min_support']}，"
+            f"最小置信度 {run['params']['min_confidence']}（{run['created_at']}）"
+        )
+        
+        col1, col2 = st.columns(2)
+        with col1:
+            category = st.selectbox(
+                "结论类别",
+                [None] + list(ITEM_CATEGORIES),
+                format_func=lambda key: "全部" if key is None else ITEM_CATEGORIES[key]
+            )
+        with col2:
+            color_only = st.checkbox("只看以色彩为前提的规则", value=True)
+        
+        rules = self.miner.get_rules(
+            consequent_category=category,
+            antecedent_prefix='color=' if color_only else None
+        )
+        if not rules:
+            st.write("没有符合条件的规则")
+            return
+        
+        st.dataframe(pd.DataFrame([
+            {
+                '前提': ' + '.join(rule['antecedents']),
+                '结论': ' + '.join(rule['consequents']),
+                '支持度': round(rule['support'], 3),
+                '置信度': round(rule['confidence'], 2),
+                '提升度': round(rule['lift'], 2)
+            }
+            for rule in rules
+        ]), use_container_width=True)
+    
+    def metrics_page(self):
+        """各阶段耗时统计（本进程内，页面重跑和会话间累计）"""
+        import pandas as pd
+        st.header("性能")
+        
+        rows = REGISTRY.snapshot()
+        if not rows:
+            st.info("暂无计时数据，请先使用其他页面")
+            return
+        
+        st.dataframe(pd.DataFrame([
+            {
+                '阶段': row['name'],
+                '次数': row['count'],
+                '总耗时(秒)': round(row['total'], 3),
+                '平均(毫秒)': round(row['mean'] * 1000, 2),
+                'P50(毫秒)': round(row['p50'] * 1000, 2),
+                'P90(毫秒)': round(row['p90'] * 1000, 2),
+                'P99(毫秒)': round(row['p99'] * 1000, 2),
+                '最大(毫秒)': round(row['max'] * 1000, 2)
+            }
+            for row in rows
+        ]), use_container_width=True)
+        
+        text = REGISTRY.prometheus_text()
+        col1, col2 = st.columns(2)
+        with col1:
+            st.download_button("下载 Prometheus 格式", text, file_name="metrics.prom", mime="text/plain")
+        with col2:
+            if st.button("清空统计"):
+                REGISTRY.reset()
+                st.rerun()
+        
+        with st.expander("Prometheus 文本"):
+            st.code(text, language='text')
     
     def run(self):
         self.setup_page()
         page = self.show_sidebar()
         
-        if page == "数据录入":
-            self.data_input_page()
-        elif page == "作品查看":
-            self.view_artwork_page()
-        elif page == "数据分析":
-            self.analysis_page()
-        elif page == "心理映射":
-            self.psychological_mapping_page()
-        elif page == "统计报告":
-            self.report_page()
+        if page == "性能":
+            self.metrics_page()
+            return
+        
+        with timed(f"ui.page.{page}"):
+            if page == "数据录入":
+                self.data_input_page()
+            elif page == "作品查看":
+                self.view_artwork_page()
+            elif page == "数据分析":
+                self.analysis_page()
+            elif page == "心理映射":
+                self.psychological_mapping_page()
+            elif page == "统计报告":
+                self.report_page()
 
 if __name__ == "__main__":
     app = ArtworkAnalysisUI()
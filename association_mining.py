@@ -0,0 +1,252 @@
+import json
+import time
+import argparse
+import numpy as np
+from color_analyzer import BASE_COLOR_NAMES
+from database_setup import create_database
+from db_connection import get_database
+
+# 年龄分段：(最大年龄, 名称)
+AGE_BANDS = [(3, '2-3岁'), (5, '4-5岁'), (7, '6-7岁')]
+
+# 项目前缀（规则展示和筛选使用）
+ITEM_CATEGORIES = {
+    'color': '色彩',
+    'emotion': '情绪',
+    'age': '年龄',
+    'medium': '媒介',
+    'setting': '教育环境'
+}
+
+# 频繁项集算法（mlxtend.frequent_patterns 中的函数名；pandas/scipy/mlxtend 在挖掘时才导入）
+ALGORITHMS = ('fpgrowth', 'apriori')
+
+
+def age_band(age):
+    for limit, name in AGE_BANDS:
+        if age <= limit:
+            return name
+    return f"{AGE_BANDS[-1][0]}岁以上"
+
+
+def item_category(item):
+    return item.split('=', 1)[0]
+
+
+class AssociationMiner:
+    """色彩-情绪/年龄/媒介/教育环境 关联规则挖掘
+
+    每件作品编码为一条稀疏布尔事务（基础色彩桶、创作情绪、年龄段、
+    媒介、教育环境），按作品ID分块读取和编码，内存只与非零项数量相关。
+    挖掘结果保存到 association_runs / association_rules 表供界面读取。
+    """
+
+    def __init__(self, db_path='artwork_database.db', min_coverage=0.1, chunk_size=5000):
+        self.db_path = db_path
+        self.min_coverage = min_coverage
+        self.chunk_size = chunk_size
+        create_database(db_path)
+        self.db = get_database(db_path)
+
+    def _iter_transactions(self):
+        """按作品ID分块生成 (作品ID, 项目列表)"""
+        placeholders = ', '.join('?' * len(BASE_COLOR_NAMES))
+        after_id = 0
+        while True:
+            _, rows = self.db.query('''
+                SELECT a.artwork_id, a.emotional_state, a.medium, c.age, c.education_setting
+                FROM artworks a
+                JOIN children c ON c.child_id = a.child_id
+                WHERE a.artwork_id > ?
+                ORDER BY a.artwork_id
+                LIMIT ?
+            ''', (after_id, self.chunk_size))
+            if not rows:
+                return
+
+            # 本块作品使用的基础色彩（来自色彩桶倒排索引）
+            _, color_rows = self.db.query(f'''
+                SELECT artwork_id, bucket FROM color_index
+                WHERE bucket IN ({placeholders}) AND coverage >= ?
+                  AND artwork_id BETWEEN ? AND ?
+            ''', (*BASE_COLOR_NAMES, self.min_coverage, rows[0][0], rows[-1][0]))
+            colors = {}
+            for artwork_id, bucket in color_rows:
+                colors.setdefault(artwork_id, []).append(f"color={bucket}")
+
+            for artwork_id, emotional_state, medium, age, setting in rows:
+                items = colors.get(artwork_id, [])
+                if emotional_state:
+                    items.append(f"emotion={emotional_state}")
+                if age is not None:
+                    items.append(f"age={age_band(age)}")
+                if medium:
+                    items.append(f"medium={medium}")
+                if setting:
+                    items.append(f"setting={setting}")
+                yield artwork_id, items
+
+            after_id = rows[-1][0]
+
+    def encode(self):
+        """编码全部作品，返回稀疏布尔 DataFrame（行：作品，列：项目）"""
+        import pandas as pd
+        from scipy import sparse
+
+        vocabulary = {}
+        row_indices = []
+        column_indices = []
+        n_rows = 0
+        for _, items in self._iter_transactions():
+            for item in items:
+                column_indices.append(vocabulary.setdefault(item, len(vocabulary)))
+                row_indices.append(n_rows)
+            n_rows += 1
+
+        matrix = sparse.csr_matrix(
+            (np.ones(len(row_indices), dtype=bool), (row_indices, column_indices)),
+            shape=(n_rows, len(vocabulary))
+        )
+        columns = sorted(vocabulary, key=vocabulary.get)
+        return pd.DataFrame.sparse.from_spmatrix(matrix, columns=columns)
+
+    def mine(self, min_support=0.05, min_confidence=0.3, max_len=3, algorithm='fpgrowth'):
+        """挖掘关联规则并保存，返回本次运行的ID和规则数"""
+        if algorithm not in ALGORITHMS:
+            raise ValueError(f"Unknown algorithm: {algorithm}")
+        from mlxtend import frequent_patterns
+        from mlxtend.frequent_patterns import association_rules
+
+        start = time.perf_counter()
+        transactions = self.encode()
+        if transactions.empty or transactions.shape[1] == 0:
+            return None, 0
+
+        frequent = getattr(frequent_patterns, algorithm)(
+            transactions, min_support=min_support, use_colnames=True, max_len=max_len
+        )
+        if frequent.empty:
+            rules = frequent
+        else:
+            try:
+                rules = association_rules(
+                    frequent, num_itemsets=len(transactions),
+                    metric='confidence', min_threshold=min_confidence
+                )
+            except TypeError:
+                # mlxtend 0.23 之前没有 num_itemsets 参数
+                rules = association_rules(frequent, metric='confidence', min_threshold=min_confidence)
+
+        records = [
+            (
+                json.dumps(sorted(row.antecedents), ensure_ascii=False),
+                json.dumps(sorted(row.consequents), ensure_ascii=False),
+                ','.join(sorted({item_category(item) for item in row.consequents})),
+                float(row.support),
+                float(row.confidence),
+                float(row.lift)
+            )
+            for row in rules.itertuples(index=False)
+        ] if not rules.empty else []
+
+        params = {
+            'algorithm': algorithm,
+            'min_support': min_support,
+            'min_confidence': min_confidence,
+            'max_len': max_len,
+            'min_coverage': self.min_coverage
+        }
+        elapsed = time.perf_counter() - start
+
+        def save(conn):
+            cursor = conn.execute('''
+                INSERT INTO association_runs (n_transactions, n_items, params, elapsed)
+                VALUES (?, ?, ?, ?)
+            ''', (len(transactions), transactions.shape[1], json.dumps(params), elapsed))
+            run_id = cursor.lastrowid
+            conn.executemany('''
+                INSERT INTO association_rules (
+                    run_id, antecedents, consequents, consequent_categories,
+                    support, confidence, lift
+                ) VALUES (?, ?, ?, ?, ?, ?, ?)
+            ''', [(run_id, *record) for record in records])
+            # 只保留最近一次运行的规则
+            conn.execute('DELETE FROM association_rules WHERE run_id < ?', (run_id,))
+            return run_id
+
+        return self.db.write(save), len(records)
+
+    def latest_run(self):
+        """最近一次挖掘的概况，没有时返回 None"""
+        columns, rows = self.db.query('''
+            SELECT run_id, n_transactions, n_items, params, elapsed, created_at
+            FROM association_runs ORDER BY run_id DESC LIMIT 1
+        ''')
+        if not rows:
+            return None
+        run = dict(zip(columns, rows[0]))
+        run['params'] = json.loads(run['params'])
+        return run
+
+    def get_rules(self, consequent_category=None, antecedent_prefix=None, min_lift=1.0, limit=50):
+        """读取最近一次运行的规则，按提升度排序
+
+        consequent_category 为结论的项目类别（如 emotion），antecedent_prefix
+        限定前提中包含某类项目（如 color=）。
+        """
+        conditions = ['r.run_id = (SELECT MAX(run_id) FROM association_runs)', 'r.lift >= ?']
+        params = [min_lift]
+        if consequent_category:
+            conditions.append('r.consequent_categories = ?')
+            params.append(consequent_category)
+        if antecedent_prefix:
+            conditions.append('r.antecedents LIKE ?')
+            params.append(f'%"{antecedent_prefix}%')
+        params.append(limit)
+
+        columns, rows = self.db.query(f'''
+            SELECT r.antecedents, r.consequents, r.support, r.confidence, r.lift
+            FROM association_rules r
+            WHERE {' AND '.join(conditions)}
+            ORDER BY r.lift DESC, r.confidence DESC
+            LIMIT ?
+        ''', params)
+        rules = []
+        for row in rows:
+            rule = dict(zip(columns, row))
+            rule['antecedents'] = json.loads(rule['antecedents'])
+            rule['consequents'] = json.loads(rule['consequents'])
+            rules.append(rule)
+        return rules
+
+
+def main():
+    parser = argparse.ArgumentParser(description="挖掘色彩与情绪、年龄、媒介、教育环境的关联规则")
+    parser.add_argument('--db', default='artwork_database.db', help="数据库路径")
+    parser.add_argument('--min-support', type=float, default=0.05, help="最小支持度")
+    parser.add_argument('--min-confidence', type=float, default=0.3, help="最小置信度")
+    parser.add_argument('--max-len', type=int, default=3, help="项集最大长度")
+    parser.add_argument('--min-coverage', type=float, default=0.1, help="色彩计入事务的最低占比")
+    parser.add_argument('--algorithm', choices=sorted(ALGORITHMS), default='fpgrowth', help="频繁项集算法")
+    args = parser.parse_args()
+
+    miner = AssociationMiner(args.db, min_coverage=args.min_coverage)
+    run_id, n_rules = miner.mine(
+        min_support=args.min_support,
+        min_confidence=args.min_confidence,
+        max_len=args.max_len,
+        algorithm=args.algorithm
+    )
+    if run_id is None:
+        print("暂无作品数据")
+        return
+    run = miner.latest_run()
+    print(f"挖掘完成: {run['n_transactions']} 件作品, {run['n_items']} 个项目, "
+          f"{n_rules} 条规则, 用时 {run['elapsed']:.2f} 秒")
+    for rule in miner.get_rules(limit=10):
+        print(f"  {' + '.join(rule['antecedents'])} => {' + '.join(rule['consequents'])} "
+              f"(支持度 {rule['support']:.3f}, 置信度 {rule['confidence']:.2f}, 提升度 {rule['lift']:.2f})")
+
+
+if __name__ == "__main__":
+    main()
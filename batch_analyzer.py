@@ -0,0 +1,196 @@
+import os
+import time
+import argparse
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from color_analyzer import ColorAnalyzer
+from analysis_store import AnalysisStore, compute_image_hash
+from canonical_arrays import ARRAY_DIR, load_canonical_array
+
+# 每个工作进程持有一个分析器实例和标准数组目录
+_worker_analyzer = None
+_worker_array_dir = ARRAY_DIR
+
+
+def _init_worker(array_dir=ARRAY_DIR):
+    global _worker_analyzer, _worker_array_dir
+    _worker_analyzer = ColorAnalyzer()
+    _worker_array_dir = array_dir
+
+
+def _analyze_task(task):
+    """工作进程中执行：分析单个作品，异常以结果形式返回"""
+    artwork_id, image_path, stored_hash, image_hash = task
+    try:
+        stat = os.stat(image_path)
+        if image_hash is None:
+            image_hash = compute_image_hash(image_path)
+
+        # 文件被touch但内容未变，无需重新分析
+        if image_hash == stored_hash:
+            analysis = None
+        else:
+            # 优先使用导入时生成的标准数组（内存映射，无需解码）
+            array = load_canonical_array(image_hash, _worker_array_dir)
+            analysis = _worker_analyzer.analyze(array if array is not None else image_path)
+
+        return {
+            'artwork_id': artwork_id,
+            'image_hash': image_hash,
+            'analysis': analysis,
+            'image_size': stat.st_size,
+            'image_mtime': stat.st_mtime,
+            'error': None
+        }
+    except Exception as e:
+        return {'artwork_id': artwork_id, 'image_hash': task[3], 'error': str(e)}
+
+
+class BatchAnalyzer:
+    """批量色彩分析
+
+    找出所有没有当前分析结果的作品，在进程池中并行分析，并按批次
+    写回数据库。每批提交后即持久化，中断后重新运行会从剩余作品继续。
+    """
+
+    def __init__(self, db_path='artwork_database.db', workers=None, chunk_size=4, commit_every=32):
+        self.db_path = db_path
+        self.workers = workers or os.cpu_count() or 1
+        self.chunk_size = chunk_size
+        self.commit_every = commit_every
+        self.store = AnalysisStore(db_path)
+
+    def run(self, progress_callback=None, limit=None):
+        """执行批量分析，返回统计结果
+
+        progress_callback(done, total, images_per_second) 在每个作品完成后调用。
+        """
+        tasks = self.store.list_pending()
+        if limit is not None:
+            tasks = tasks[:limit]
+
+        summary = {
+            'total': len(tasks),
+            'analyzed': 0,
+            'reused': 0,
+            'unchanged': 0,
+            'failed': 0,
+            'errors': [],
+            'elapsed': 0.0,
+            'images_per_second': 0.0
+        }
+        if not tasks:
+            return summary
+
+        start = time.perf_counter()
+        pending_records = []
+        done = 0
+
+        # 相同内容只分析一次：已有结果的直接复用，重复的等首个结果出来后复用；
+        # 首个分析失败时改用下一件重复作品重试，全部失败时逐件报告
+        existing = self.store.get_analyses_by_hash(
+            {task[3] for task in tasks if task[3] is not None}
+        )
+        work = []
+        duplicates = defaultdict(list)
+        for task in tasks:
+            artwork_id, _, _, image_hash = task
+            if image_hash in existing:
+                pending_records.append((artwork_id, image_hash, existing[image_hash], None, None))
+                summary['reused'] += 1
+                done += 1
+            elif image_hash is not None and image_hash in duplicates:
+                duplicates[image_hash].append(task)
+            else:
+                if image_hash is not None:
+                    duplicates[image_hash] = []
+                work.append(task)
+
+        with ProcessPoolExecutor(
+            max_workers=self.workers, initializer=_init_worker, initargs=(self.store.array_dir,)
+        ) as executor:
+            while work:
+                retry = []
+                for result in executor.map(_analyze_task, work, chunksize=self.chunk_size):
+                    done += 1
+
+                    if result['error'] is not None:
+                        summary['failed'] += 1
+                        summary['errors'].append((result['artwork_id'], result['error']))
+                        queued = duplicates.pop(result['image_hash'], None)
+                        if queued:
+                            retry.append(queued[0])
+                            duplicates[result['image_hash']] = queued[1:]
+                    else:
+                        if result['analysis'] is None:
+                            summary['unchanged'] += 1
+                        else:
+                            summary['analyzed'] += 1
+                        pending_records.append((
+                            result['artwork_id'],
+                            result['image_hash'],
+                            result['analysis'],
+                            result['image_size'],
+                            result['image_mtime']
+                        ))
+                        for duplicate in duplicates.pop(result['image_hash'], []):
+                            pending_records.append((
+                                duplicate[0],
+                                result['image_hash'],
+                                result['analysis'],
+                                result['image_size'],
+                                result['image_mtime']
+                            ))
+                            summary['reused'] += 1
+                            done += 1
+
+                    # 批量提交
+                    if len(pending_records) >= self.commit_every:
+                        self.store.save_many(pending_records)
+                        pending_records = []
+
+                    if progress_callback:
+                        elapsed = time.perf_counter() - start
+                        progress_callback(done, len(tasks), done / elapsed if elapsed else 0.0)
+
+                work = retry
+
+        if pending_records:
+            self.store.save_many(pending_records)
+
+        summary['elapsed'] = time.perf_counter() - start
+        summary['images_per_second'] = done / summary['elapsed'] if summary['elapsed'] else 0.0
+        return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description="批量分析未分析的作品")
+    parser.add_argument('--db', default='artwork_database.db', help="数据库路径")
+    parser.add_argument('--workers', type=int, default=None, help="工作进程数（默认CPU核数）")
+    parser.add_argument('--chunk-size', type=int, default=4, help="每次分发给工作进程的作品数")
+    parser.add_argument('--commit-every', type=int, default=32, help="每批提交的结果数")
+    parser.add_argument('--limit', type=int, default=None, help="本次最多分析的作品数")
+    args = parser.parse_args()
+
+    batch = BatchAnalyzer(
+        db_path=args.db,
+        workers=args.workers,
+        chunk_size=args.chunk_size,
+        commit_every=args.commit_every
+    )
+
+    def report(done, total, rate):
+        print(f"\r进度: {done}/{total} ({rate:.2f} 张/秒)", end='', flush=True)
+
+    summary = batch.run(progress_callback=report, limit=args.limit)
+    print()
+    print(f"完成: 分析 {summary['analyzed']} 张, 复用 {summary['reused']} 张, "
+          f"未变化 {summary['unchanged']} 张, "
+          f"失败 {summary['failed']} 张, 用时 {summary['elapsed']:.1f} 秒 "
+          f"({summary['images_per_second']:.2f} 张/秒)")
+    for artwork_id, error in summary['errors']:
+        print(f"  作品 #{artwork_id}: {error}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,4 @@
+"""性能基准测试：合成作品生成器和基准运行器
+
+用法：python -m benchmarks.run --help
+"""
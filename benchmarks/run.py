@@ -0,0 +1,382 @@
+import os
+import sys
+import json
+import time
+import shutil
+import hashlib
+import platform
+import argparse
+import tempfile
+import statistics
+import subprocess
+from datetime import datetime
+import numpy as np
+from PIL import Image
+
+# 以 python -m benchmarks.run 或 python benchmarks/run.py 运行时都能导入项目模块
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.synthetic import generate_drawing, generate_metadata, synthetic_palette
+from analysis_cache import AnalysisCache
+from color_analyzer import ColorAnalyzer, ANALYSIS_MODES, DECODE_MODES
+from data_importer import ArtworkImporter
+from db_connection import get_database
+from report_aggregates import ReportAggregates, rebuild_aggregates
+from color_index import rebuild_color_index
+from canonical_arrays import write_canonical_array, load_canonical_array
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_BASELINE = os.path.join(BENCHMARK_DIR, 'baseline.json')
+DEFAULT_SIZES = [10, 1000, 10000, 100000]
+QUICK_SIZES = [10, 1000]
+DEFAULT_RESOLUTIONS = [(400, 300), (800, 600), (1600, 1200)]
+# 解码基准使用的原图尺寸（扫描件和手机照片）
+DECODE_RESOLUTIONS = [(1600, 1200), (4000, 3000)]
+
+
+def measure(func, repeats):
+    """运行 func repeats 次，返回每次耗时（秒）"""
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return times
+
+
+def result(name, params, times, items=1):
+    """整理为可比较的结果记录；items 为每次运行处理的条目数"""
+    median = statistics.median(times)
+    return {
+        'name': name,
+        'params': params,
+        'repeats': len(times),
+        'min': min(times),
+        'median': median,
+        'mean': statistics.mean(times),
+        'items': items,
+        'per_item': median / items if items else None
+    }
+
+
+def result_key(record):
+    return f"{record['name']}|{json.dumps(record['params'], sort_keys=True, ensure_ascii=False)}"
+
+
+class BenchmarkRunner:
+    """在临时目录中生成合成作品和语料库并计时各项操作"""
+
+    def __init__(self, workdir, sizes, resolutions, repeats=3, import_count=20, log=print):
+        self.workdir = workdir
+        self.sizes = sorted(sizes)
+        self.resolutions = resolutions
+        self.repeats = repeats
+        self.import_count = import_count
+        self.log = log
+        self.results = []
+        # 关闭缓存，测量的是实际计算
+        self.analyzer = ColorAnalyzer(cache=AnalysisCache(max_bytes=0))
+        self._images = {}
+
+    def image_path(self, size, seed=0, image_format='PNG'):
+        """按分辨率和格式生成（并复用）合成作品文件"""
+        key = (size, seed, image_format)
+        if key not in self._images:
+            extension = 'jpg' if image_format == 'JPEG' else image_format.lower()
+            path = os.path.join(self.workdir, 'images', f"drawing_{seed}_{size[0]}x{size[1]}.{extension}")
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            generate_drawing(seed, size).save(path, format=image_format, quality=90)
+            self._images[key] = path
+        return self._images[key]
+
+    def record(self, name, params, times, items=1, **extra):
+        entry = result(name, params, times, items)
+        entry.update(extra)
+        self.results.append(entry)
+        self.log(f"{name:32s} {json.dumps(params, ensure_ascii=False):40s} "
+                 f"median {entry['median'] * 1000:10.2f} ms")
+
+    def bench_extract_dominant_colors(self):
+        for size in self.resolutions:
+            path = self.image_path(size)
+            for mode in ANALYSIS_MODES:
+                times = measure(
+                    lambda: self.analyzer.extract_dominant_colors(path, mode=mode), self.repeats
+                )
+                self.record('extract_dominant_colors',
+                            {'resolution': f"{size[0]}x{size[1]}", 'mode': mode}, times)
+
+    def bench_analyze_color_distribution(self):
+        for size in self.resolutions:
+            path = self.image_path(size)
+            times = measure(lambda: self.analyzer.analyze_color_distribution(path), self.repeats)
+            self.record('analyze_color_distribution', {'resolution': f"{size[0]}x{size[1]}"}, times)
+
+    def bench_decode(self, max_size=800):
+        """原图解码并缩放到分析尺寸：耗时和解码缓冲区大小
+
+        对比全尺寸解码、DCT域缩小解码和内存映射加载导入时生成的标准数组
+        （读取全部像素，不需要解码缓冲区）。
+        """
+        array_dir = os.path.join(self.workdir, 'arrays')
+        for size in DECODE_RESOLUTIONS:
+            for image_format in ['JPEG', 'PNG']:
+                path = self.image_path(size, image_format=image_format)
+                for decode in DECODE_MODES:
+                    analyzer = ColorAnalyzer(cache=AnalysisCache(max_bytes=0), decode=decode)
+                    times = measure(lambda: analyzer._preprocess_image(path, max_size), self.repeats)
+                    with Image.open(path) as img:
+                        analyzer._decode(img, max_size)
+                        decoded_bytes = img.width * img.height * len(img.getbands())
+                    self.record('decode', {
+                        'resolution': f"{size[0]}x{size[1]}",
+                        'format': image_format,
+                        'decode': decode
+                    }, times, decoded_mb=round(decoded_bytes / (1 << 20), 2))
+                    self.log(f"{'':32s} 解码缓冲区 {decoded_bytes / (1 << 20):.1f} MB")
+
+                image_hash = hashlib.sha256(path.encode('utf-8')).hexdigest()
+                write_canonical_array(path, image_hash, array_dir)
+                times = measure(
+                    lambda: int(np.asarray(load_canonical_array(image_hash, array_dir)).sum()), self.repeats
+                )
+                self.record('decode', {
+                    'resolution': f"{size[0]}x{size[1]}",
+                    'format': image_format,
+                    'decode': 'canonical'
+                }, times, decoded_mb=0.0)
+
+    def bench_find_nearest_base_color(self, n=10000):
+        rng = np.random.default_rng(0)
+        colors = ['#%02x%02x%02x' % tuple(rgb) for rgb in rng.integers(0, 256, size=(n, 3))]
+
+        def single():
+            for color in colors:
+                ColorAnalyzer.find_nearest_base_color(color)
+
+        self.record('find_nearest_base_color', {'colors': n}, measure(single, self.repeats), n)
+        self.record('classify_base_colors', {'colors': n},
+                    measure(lambda: ColorAnalyzer.classify_base_colors(colors), self.repeats), n)
+
+    def populate_corpus(self, db_path, start, end):
+        """直接写库生成作品 start+1..end（含分析结果），用于大规模语料测试"""
+        if end <= start:
+            return
+        seeds = range(start + 1, end + 1)
+        palettes = [synthetic_palette(seed) for seed in seeds]
+        psychology = self.analyzer.analyze_color_psychology_batch(palettes)
+
+        def emotions_of(row):
+            return sorted(
+                [(name, float(weight)) for name, weight in zip(psychology['emotions'], row) if weight > 0],
+                key=lambda item: item[1], reverse=True
+            )
+
+        children, artworks, analyses, mappings = [], [], [], []
+        for index, seed in enumerate(seeds):
+            child_data, artwork_data = generate_metadata(seed)
+            children.append((seed, child_data['age'], child_data['gender'],
+                             child_data['location'], child_data['education_setting']))
+            artworks.append((seed, seed, artwork_data['creation_date'], f"synthetic/{seed}.png",
+                             f"synthetic-{seed}", artwork_data['medium'], artwork_data['artwork_theme'],
+                             artwork_data['creation_setting'], artwork_data['emotional_state']))
+            analyses.append((seed, f"synthetic-{seed}", json.dumps(palettes[index]), '{}', '[]'))
+            mappings.append((seed, f"synthetic-{seed}",
+                             json.dumps(emotions_of(psychology['emotion_weights'][index]),
+                                        ensure_ascii=False), '[]'))
+
+        def write(conn):
+            conn.executemany('''
+                INSERT INTO children (child_id, age, gender, location, education_setting)
+                VALUES (?, ?, ?, ?, ?)
+            ''', children)
+            conn.executemany('''
+                INSERT INTO artworks (artwork_id, child_id, creation_date, image_path, image_hash,
+                                      medium, artwork_theme, creation_setting, emotional_state)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ''', artworks)
+            conn.executemany('''
+                INSERT INTO color_analysis (artwork_id, image_hash, dominant_colors,
+                                            color_distribution, color_combinations)
+                VALUES (?, ?, ?, ?, ?)
+            ''', analyses)
+            conn.executemany('''
+                INSERT INTO psychological_mappings (artwork_id, image_hash,
+                                                    emotional_indicators, personality_traits)
+                VALUES (?, ?, ?, ?)
+            ''', mappings)
+
+        get_database(db_path).write(write)
+
+    def bench_corpus(self):
+        """按语料规模测试导入、作品列表和统计报告"""
+        db_path = os.path.join(self.workdir, 'corpus.db')
+        importer = ArtworkImporter(db_path)
+        aggregates = ReportAggregates(db_path)
+        db = get_database(db_path)
+
+        rows = 0
+        for round_index, size in enumerate(self.sizes):
+            self.log(f"-- 语料规模 {size}")
+            self.populate_corpus(db_path, rows, size)
+            rows = size
+
+            # 汇总和倒排索引按当前数据重建（同时计时重建本身）
+            times = measure(lambda: db.write(lambda conn: rebuild_aggregates(conn.cursor())), 1)
+            self.record('report_aggregates_rebuild', {'corpus': size}, times, size)
+            db.write(lambda conn: rebuild_color_index(conn.cursor()))
+
+            self.record('report_aggregation', {'corpus': size},
+                        measure(aggregates.get_report, self.repeats))
+            self.record('get_all_artworks', {'corpus': size},
+                        measure(importer.get_all_artworks, self.repeats), size)
+            self.record('get_artworks_page', {'corpus': size},
+                        measure(lambda: importer.get_artworks_page({'age_range': (4, 5)}), self.repeats))
+
+            # 在已有语料上导入真实图片（每轮使用新图片，避免按内容去重跳过存储）
+            seeds = range(round_index * self.import_count, (round_index + 1) * self.import_count)
+            paths = [self.image_path((800, 600), seed) for seed in seeds]
+            records = [generate_metadata(seed) for seed in seeds]
+            start = time.perf_counter()
+            for path, (child_data, artwork_data) in zip(paths, records):
+                outcome = importer.import_complete_record(dict(child_data), dict(artwork_data), path)
+                if not outcome['success']:
+                    raise RuntimeError(outcome['error'])
+            elapsed = time.perf_counter() - start
+            self.record('import_complete_record', {'corpus': size}, [elapsed], self.import_count)
+
+            # 导入的作品编号在合成语料之后，下一轮从新的最大ID继续
+            _, id_rows = db.query('SELECT MAX(artwork_id) FROM artworks')
+            rows = id_rows[0][0]
+
+    BENCHMARKS = {
+        'extract_dominant_colors': bench_extract_dominant_colors,
+        'analyze_color_distribution': bench_analyze_color_distribution,
+        'decode': bench_decode,
+        'find_nearest_base_color': bench_find_nearest_base_color,
+        'corpus': bench_corpus
+    }
+
+    def run(self, only=None):
+        for name, bench in self.BENCHMARKS.items():
+            if only and name not in only:
+                continue
+            bench(self)
+        return self.results
+
+
+def environment():
+    """记录运行环境，便于对比不同机器上的结果"""
+    import sklearn
+    import cv2
+    try:
+        commit = subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+            cwd=os.path.dirname(BENCHMARK_DIR), timeout=10
+        ).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        commit = None
+    return {
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'commit': commit,
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'numpy': np.__version__,
+        'sklearn': sklearn.__version__,
+        'opencv': cv2.__version__
+    }
+
+
+def compare(results, baseline, tolerance):
+    """与基线比较中位数，返回 (比较记录列表, 是否存在回退)"""
+    baseline_results = {result_key(record): record for record in baseline.get('results', [])}
+    comparisons = []
+    regressed = False
+    for record in results:
+        reference = baseline_results.get(result_key(record))
+        if reference is None:
+            comparisons.append((record, None, 'new'))
+            continue
+        ratio = record['median'] / reference['median'] if reference['median'] else float('inf')
+        if ratio > 1 + tolerance:
+            status = 'REGRESSION'
+            regressed = True
+        elif ratio < 1 - tolerance:
+            status = 'faster'
+        else:
+            status = 'ok'
+        comparisons.append((record, ratio, status))
+    return comparisons, regressed
+
+
+def parse_resolution(value):
+    width, height = value.lower().split('x')
+    return int(width), int(height)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="运行性能基准测试")
+    parser.add_argument('--sizes', type=int, nargs='+', default=None,
+                        help=f"语料规模（默认 {DEFAULT_SIZES}）")
+    parser.add_argument('--quick', action='store_true', help=f"快速模式：语料规模 {QUICK_SIZES}，重复1次")
+    parser.add_argument('--resolutions', type=parse_resolution, nargs='+', default=DEFAULT_RESOLUTIONS,
+                        help="合成作品分辨率，如 800x600")
+    parser.add_argument('--repeats', type=int, default=3, help="每项重复次数（取中位数）")
+    parser.add_argument('--import-count', type=int, default=20, help="每个规模下导入的图片数")
+    parser.add_argument('--only', nargs='+', choices=list(BenchmarkRunner.BENCHMARKS), help="只运行指定项目")
+    parser.add_argument('--output', default=None, help="结果JSON路径（默认 benchmarks/results/时间戳.json）")
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE, help="基线JSON路径")
+    parser.add_argument('--save-baseline', action='store_true', help="把本次结果保存为基线")
+    parser.add_argument('--tolerance', type=float, default=0.25, help="中位数变慢超过该比例视为回退")
+    parser.add_argument('--fail-on-regression', action='store_true', help="存在回退时以非零状态退出")
+    parser.add_argument('--keep-workdir', action='store_true', help="保留临时目录")
+    args = parser.parse_args()
+
+    sizes = args.sizes or (QUICK_SIZES if args.quick else DEFAULT_SIZES)
+    repeats = 1 if args.quick else args.repeats
+    output = args.output or os.path.join(
+        BENCHMARK_DIR, 'results', f"{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+    )
+    output = os.path.abspath(output)
+    baseline_path = os.path.abspath(args.baseline)
+
+    # 导入器按当前目录写 data/，在临时目录中运行避免污染项目数据
+    workdir = tempfile.mkdtemp(prefix='artwork_bench_')
+    cwd = os.getcwd()
+    os.chdir(workdir)
+    try:
+        runner = BenchmarkRunner(workdir, sizes, args.resolutions, repeats, args.import_count)
+        results = runner.run(args.only)
+    finally:
+        os.chdir(cwd)
+        if not args.keep_workdir:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    report = {'environment': environment(), 'results': results}
+    os.makedirs(os.path.dirname(output), exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"\n结果已保存: {output}")
+
+    regressed = False
+    if os.path.exists(baseline_path) and not args.save_baseline:
+        with open(baseline_path, encoding='utf-8') as f:
+            baseline = json.load(f)
+        comparisons, regressed = compare(results, baseline, args.tolerance)
+        print(f"\n与基线比较（{baseline['environment'].get('commit')}, 容差 {args.tolerance:.0%}）:")
+        for record, ratio, status in comparisons:
+            ratio_text = f"{ratio:6.2f}x" if ratio is not None else "     -"
+            print(f"  {status:10s} {ratio_text} {record['name']} "
+                  f"{json.dumps(record['params'], ensure_ascii=False)}")
+
+    if args.save_baseline:
+        shutil.copyfile(output, baseline_path)
+        print(f"已保存为基线: {baseline_path}")
+
+    if regressed and args.fail_on_regression:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
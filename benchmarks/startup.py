@@ -0,0 +1,123 @@
+import os
+import sys
+import json
+import argparse
+import subprocess
+from datetime import datetime
+
+# 以 python -m benchmarks.startup 或 python benchmarks/startup.py 运行时都能导入项目模块
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.run import BENCHMARK_DIR, result, environment, compare
+
+PROJECT_DIR = os.path.dirname(BENCHMARK_DIR)
+DEFAULT_BASELINE = os.path.join(BENCHMARK_DIR, 'startup_baseline.json')
+DEFAULT_ENTRY = 'app'
+
+# 启动时不应加载的重量级依赖（只在用到的页面和代码路径中导入）
+HEAVY_MODULES = [
+    'sklearn', 'cv2', 'pandas', 'scipy', 'mlxtend', 'matplotlib', 'plotly.express'
+]
+
+
+def project_modules():
+    """项目顶层模块名"""
+    return sorted(
+        name[:-3] for name in os.listdir(PROJECT_DIR)
+        if name.endswith('.py') and not name.startswith('_')
+    )
+
+
+def parse_importtime(output):
+    """解析 python -X importtime 的输出，返回 {模块名: 累计耗时（秒）}"""
+    cumulative = {}
+    for line in output.splitlines():
+        if not line.startswith('import time:'):
+            continue
+        fields = line[len('import time:'):].split('|')
+        if len(fields) != 3 or not fields[1].strip().isdigit():
+            continue  # 表头
+        name = fields[2].strip()
+        cumulative.setdefault(name, int(fields[1]) / 1e6)
+    return cumulative
+
+
+def measure_import(entry=DEFAULT_ENTRY):
+    """在新解释器中导入 entry，返回 {模块名: 累计耗时（秒）}"""
+    completed = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f"import {entry}"],
+        cwd=PROJECT_DIR, capture_output=True, text=True, timeout=300
+    )
+    if completed.returncode != 0:
+        raise RuntimeError(f"import {entry} failed:\n{completed.stderr[-2000:]}")
+    return parse_importtime(completed.stderr)
+
+
+def run_startup(entry=DEFAULT_ENTRY, repeats=5, log=print):
+    """多次测量入口模块的导入耗时，返回 (结果记录列表, 启动时被加载的重量级依赖)"""
+    runs = [measure_import(entry) for _ in range(repeats)]
+
+    modules = [entry] + [name for name in project_modules() if name != entry]
+    results = []
+    for name in modules:
+        times = [run[name] for run in runs if name in run]
+        if len(times) != len(runs):
+            continue  # 未被入口模块导入
+        record = result('startup_import', {'entry': entry, 'module': name}, times)
+        results.append(record)
+        log(f"  {name:28s} {record['median'] * 1000:9.1f} ms")
+
+    loaded = [name for name in HEAVY_MODULES if name in runs[0]]
+    for name in loaded:
+        log(f"  启动时加载了重量级依赖: {name} ({runs[0][name] * 1000:.1f} ms)")
+    return results, loaded
+
+
+def main():
+    parser = argparse.ArgumentParser(description="测量应用启动的模块导入耗时")
+    parser.add_argument('--entry', default=DEFAULT_ENTRY, help="入口模块")
+    parser.add_argument('--repeats', type=int, default=5, help="重复次数（每次使用新的解释器）")
+    parser.add_argument('--output', default=None, help="结果JSON路径（默认 benchmarks/results/startup_时间戳.json）")
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE, help="基线JSON路径")
+    parser.add_argument('--save-baseline', action='store_true', help="把本次结果保存为基线")
+    parser.add_argument('--tolerance', type=float, default=0.25, help="中位数变慢超过该比例视为回退")
+    parser.add_argument('--fail-on-regression', action='store_true',
+                        help="存在回退或启动时加载了重量级依赖时以非零状态退出")
+    args = parser.parse_args()
+
+    output = os.path.abspath(args.output or os.path.join(
+        BENCHMARK_DIR, 'results', f"startup_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+    ))
+    baseline_path = os.path.abspath(args.baseline)
+
+    print(f"import {args.entry}（{args.repeats} 次，中位数累计耗时）:")
+    results, loaded = run_startup(args.entry, args.repeats)
+
+    report = {'environment': environment(), 'results': results, 'heavy_modules_loaded': loaded}
+    os.makedirs(os.path.dirname(output), exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"\n结果已保存: {output}")
+
+    regressed = bool(loaded)
+    if os.path.exists(baseline_path) and not args.save_baseline:
+        with open(baseline_path, encoding='utf-8') as f:
+            baseline = json.load(f)
+        comparisons, slower = compare(results, baseline, args.tolerance)
+        regressed = regressed or slower
+        print(f"\n与基线比较（{baseline['environment'].get('commit')}, 容差 {args.tolerance:.0%}）:")
+        for record, ratio, status in comparisons:
+            ratio_text = f"{ratio:6.2f}x" if ratio is not None else "     -"
+            print(f"  {status:10s} {ratio_text} {record['params']['module']}")
+
+    if args.save_baseline:
+        with open(baseline_path, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"已保存为基线: {baseline_path}")
+
+    if regressed and args.fail_on_regression:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
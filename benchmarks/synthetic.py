@@ -0,0 +1,113 @@
+import os
+import json
+import numpy as np
+from PIL import Image, ImageDraw, ImageFilter
+
+# 儿童画常用的颜料色
+CRAYON_COLORS = [
+    (220, 40, 40), (245, 130, 30), (250, 215, 50), (70, 170, 70),
+    (40, 110, 200), (120, 70, 170), (240, 120, 170), (130, 80, 40),
+    (30, 30, 30), (90, 200, 220)
+]
+
+MEDIUMS = ['水彩', '蜡笔', '彩笔', '混合媒介', '其他']
+SETTINGS = ['公立幼儿园', '私立幼儿园', '其他']
+EMOTIONS = ['开心', '平静', '兴奋', '难过', '生气']
+
+
+def generate_drawing(seed, size=(800, 600), n_regions=6, n_strokes=25):
+    """生成确定性的合成儿童画
+
+    纸张底色带轻微纹理，上面是若干大面积平涂色块（椭圆、多边形）和
+    粗细不一的笔触。相同 seed 和参数总是生成相同的图片。
+    """
+    rng = np.random.default_rng(seed)
+    width, height = size
+
+    # 纸张：偏暖的白色加细小噪点
+    paper = np.array([248, 244, 232], dtype=np.int16) - rng.integers(0, 10, size=3)
+    noise = rng.integers(-6, 7, size=(height, width, 1), dtype=np.int16)
+    background = np.clip(paper + noise, 0, 255).astype(np.uint8)
+    image = Image.fromarray(background)
+    draw = ImageDraw.Draw(image)
+
+    palette = [CRAYON_COLORS[i] for i in rng.choice(len(CRAYON_COLORS), size=5, replace=False)]
+
+    def point():
+        return (int(rng.integers(0, width)), int(rng.integers(0, height)))
+
+    def color():
+        return palette[int(rng.integers(0, len(palette)))]
+
+    # 平涂色块
+    for _ in range(n_regions):
+        if rng.random() < 0.5:
+            x0, y0 = point()
+            w = int(rng.integers(width // 10, width // 2))
+            h = int(rng.integers(height // 10, height // 2))
+            draw.ellipse([x0 - w // 2, y0 - h // 2, x0 + w // 2, y0 + h // 2], fill=color())
+        else:
+            draw.polygon([point() for _ in range(int(rng.integers(3, 7)))], fill=color())
+
+    # 笔触
+    for _ in range(n_strokes):
+        points = [point()]
+        for _ in range(int(rng.integers(2, 6))):
+            x, y = points[-1]
+            points.append((
+                int(np.clip(x + rng.integers(-width // 6, width // 6), 0, width - 1)),
+                int(np.clip(y + rng.integers(-height // 6, height // 6), 0, height - 1))
+            ))
+        draw.line(points, fill=color(), width=int(rng.integers(2, max(3, width // 80))))
+
+    # 轻微模糊模拟颜料边缘
+    return image.filter(ImageFilter.GaussianBlur(radius=0.6))
+
+
+def generate_metadata(seed):
+    """生成确定性的儿童和作品信息"""
+    rng = np.random.default_rng(seed)
+    child_data = {
+        'age': int(rng.integers(2, 8)),
+        'gender': ['男', '女'][int(rng.integers(0, 2))],
+        'location': f"城市{int(rng.integers(0, 20))}",
+        'education_setting': SETTINGS[int(rng.integers(0, len(SETTINGS)))]
+    }
+    artwork_data = {
+        'creation_date': f"2024-{int(rng.integers(1, 13)):02d}-{int(rng.integers(1, 29)):02d}",
+        'medium': MEDIUMS[int(rng.integers(0, len(MEDIUMS)))],
+        'artwork_theme': '合成作品',
+        'creation_setting': '课堂',
+        'emotional_state': EMOTIONS[int(rng.integers(0, len(EMOTIONS)))]
+    }
+    return child_data, artwork_data
+
+
+def synthetic_palette(seed, n_colors=5):
+    """生成确定性的主要色彩列表 [(hex, percentage), ...]（用于直接写库的大规模语料）"""
+    rng = np.random.default_rng(seed)
+    colors = rng.integers(0, 256, size=(n_colors, 3))
+    shares = rng.dirichlet(np.ones(n_colors))
+    return [('#%02x%02x%02x' % tuple(int(v) for v in rgb), float(share))
+            for rgb, share in zip(colors, shares)]
+
+
+def write_corpus(directory, count, size=(800, 600), start_seed=0, image_format='PNG'):
+    """把 count 张合成作品写入目录，返回图片路径列表
+
+    同时写出 manifest.jsonl（可直接用于 data_importer import-batch）。
+    """
+    os.makedirs(directory, exist_ok=True)
+    paths = []
+    with open(os.path.join(directory, 'manifest.jsonl'), 'w', encoding='utf-8') as manifest:
+        for seed in range(start_seed, start_seed + count):
+            filename = f"drawing_{seed:06d}.{image_format.lower()}"
+            path = os.path.join(directory, filename)
+            if not os.path.exists(path):
+                generate_drawing(seed, size).save(path, format=image_format)
+            paths.append(path)
+
+            child_data, artwork_data = generate_metadata(seed)
+            row = {'image': filename, **child_data, **artwork_data}
+            manifest.write(json.dumps(row, ensure_ascii=False) + '\n')
+    return paths
@@ -0,0 +1,93 @@
+import os
+import argparse
+import tempfile
+import numpy as np
+from color_analyzer import ColorAnalyzer
+from database_setup import create_database
+from db_connection import get_database
+
+# 分析用标准数组：RGB uint8，最长边不超过 CANONICAL_SIZE（与分析预处理一致）
+ARRAY_DIR = 'data/color_analysis/arrays'
+CANONICAL_SIZE = 800
+
+
+def array_path(image_hash, array_dir=ARRAY_DIR):
+    """按图片内容哈希计算标准数组路径（按哈希前缀分两级目录）"""
+    return os.path.join(array_dir, image_hash[:2], image_hash[2:4], f"{image_hash}.npy")
+
+
+def decode_canonical(image):
+    """解码图片并缩放为标准数组（RGB uint8）
+
+    使用快速解码：JPEG 在DCT域按比例缩小解码，再用双线性缩放。与全尺寸
+    解码加 LANCZOS 相比，主要色彩的RGB偏差不超过约3、占比偏差约0.01
+    （见 mode_accuracy.py 的解码对比），大图导入耗时则大幅降低。
+    """
+    return ColorAnalyzer(decode='fast')._preprocess_image(image, CANONICAL_SIZE)
+
+
+def write_canonical_array(image, image_hash, array_dir=ARRAY_DIR):
+    """保存 .npy 标准数组，返回 (数组路径, 是否为新文件)
+
+    image 可以是图片路径、文件对象或已解码的标准数组。只在导入时执行一次；
+    相同内容只保存一份。
+    """
+    path = array_path(image_hash, array_dir)
+    if os.path.exists(path):
+        return path, False
+
+    array = decode_canonical(image)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            np.save(f, np.ascontiguousarray(array, dtype=np.uint8))
+        os.replace(tmp_path, path)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return path, True
+
+
+def load_canonical_array(image_hash, array_dir=ARRAY_DIR):
+    """以只读内存映射方式加载标准数组，不存在或已损坏时返回 None"""
+    if not image_hash:
+        return None
+    try:
+        return np.load(array_path(image_hash, array_dir), mmap_mode='r')
+    except (OSError, ValueError):
+        return None
+
+
+def backfill_arrays(db_path='artwork_database.db', array_dir=ARRAY_DIR):
+    """为已有作品补生成标准数组，返回 (新生成数, 失败列表)"""
+    create_database(db_path)
+    _, rows = get_database(db_path).query(
+        'SELECT artwork_id, image_path, image_hash FROM artworks WHERE image_hash IS NOT NULL'
+    )
+
+    created = 0
+    errors = []
+    for artwork_id, image_path, image_hash in rows:
+        try:
+            created += write_canonical_array(image_path, image_hash, array_dir)[1]
+        except Exception as e:
+            errors.append((artwork_id, str(e)))
+    return created, errors
+
+
+def main():
+    parser = argparse.ArgumentParser(description="生成分析用标准数组（.npy，内存映射加载）")
+    parser.add_argument('--db', default='artwork_database.db', help="数据库路径")
+    parser.add_argument('--array-dir', default=ARRAY_DIR, help="标准数组目录")
+    args = parser.parse_args()
+
+    created, errors = backfill_arrays(args.db, args.array_dir)
+    print(f"新生成标准数组 {created} 个, 失败 {len(errors)} 个")
+    for artwork_id, error in errors:
+        print(f"  作品 #{artwork_id}: {error}")
+
+
+if __name__ == "__main__":
+    main()
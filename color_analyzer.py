@@ -1,15 +1,82 @@
-import cv2
 import numpy as np
 from PIL import Image
-import matplotlib.pyplot as plt
-from sklearn.cluster import KMeans
-import plotly.express as px
-import plotly.graph_objects as go
-from functools import lru_cache
-import io
+from analysis_cache import content_key, get_shared_cache
+from metrics import timed
+from dataclasses import dataclass, asdict
+
+# cv2、sklearn 和 plotly 在用到时才导入，避免拖慢应用启动（数据录入等页面用不到）
+
+# 分析模式与聚类引擎的对应关系（速度由快到慢）
+ANALYSIS_MODES = {
+    'histogram': 'histogram',
+    'fast': 'subsample',
+    'balanced': 'minibatch',
+    'exact': 'kmeans'
+}
+
+# 解码模式与缩放滤波器：exact 全尺寸解码后 LANCZOS 缩放；fast 对 JPEG 在 DCT 域
+# 直接缩小解码，再用 reduce（整数倍盒式缩小）加双线性插值缩放到目标尺寸
+DECODE_MODES = {
+    'exact': (Image.Resampling.LANCZOS, None),
+    'fast': (Image.Resampling.BILINEAR, 2.0)
+}
+
+# 色彩嵌入的HSV分箱数（色相 × 饱和度 × 明度）
+EMBEDDING_BINS = (8, 4, 4)
+
+
+@dataclass
+class ArtworkAnalysis:
+    """单幅作品的完整色彩分析结果"""
+    dominant_colors: list
+    color_distribution: dict
+    color_combinations: list
+    psychology: dict
+    image_size: tuple = None
+    mode: str = None
+    embedding: np.ndarray = None  # 定长色彩直方图嵌入（float32），用于相似作品检索
+    
+    def figure(self):
+        """主要色彩饼图"""
+        return palette_figure(self.dominant_colors)
+    
+    def to_dict(self):
+        return asdict(self)
+    
+    @classmethod
+    def from_dict(cls, data):
+        # JSON不区分元组和列表，这里还原为元组格式
+        psychology = data.get('psychology') or {}
+        image_size = data.get('image_size')
+        return cls(
+            dominant_colors=[tuple(item) for item in data['dominant_colors']],
+            color_distribution=data['color_distribution'],
+            color_combinations=list(data.get('color_combinations') or []),
+            psychology={
+                'emotions': [tuple(item) for item in psychology.get('emotions', [])],
+                'traits': [tuple(item) for item in psychology.get('traits', [])]
+            },
+            image_size=tuple(image_size) if image_size else None,
+            mode=data.get('mode'),
+            embedding=data.get('embedding')
+        )
 
 class ColorAnalyzer:
-    def __init__(self):
+    def __init__(self, mode='exact', sample_size=20000, histogram_bits=5, cache=None, decode='fast'):
+        if mode not in ANALYSIS_MODES:
+            raise ValueError(f"Unknown analysis mode: {mode}")
+        if decode not in DECODE_MODES:
+            raise ValueError(f"Unknown decode mode: {decode}")
+        self.mode = mode
+        self.decode = decode
+        self.sample_size = sample_size
+        self.histogram_bits = histogram_bits
+        self.clustering_engines = {
+            'kmeans': self._cluster_kmeans,
+            'minibatch': self._cluster_minibatch,
+            'subsample': self._cluster_subsample,
+            'histogram': self._cluster_histogram
+        }
         self.color_psychology = {
             'red': {
                 'emotions': ['热情', '兴奋', '活力'],
@@ -32,38 +99,109 @@ class ColorAnalyzer:
                 'traits': ['想象力', '艺术性', '敏感']
             }
         }
-        self._cache = {}
-    
-    def _preprocess_image(self, image_path, max_size=800):
-        """预处理图片：调整大小和格式"""
-        with Image.open(image_path) as img:
-            # 调整图片大小以提高性能
-            if max(img.size) > max_size:
-                ratio = max_size / max(img.size)
-                new_size = tuple(int(dim * ratio) for dim in img.size)
-                img = img.resize(new_size, Image.Resampling.LANCZOS)
-            
-            # 转换为RGB模式
-            if img.mode != 'RGB':
-                img = img.convert('RGB')
-            
-            # 转换为numpy数组
-            img_array = np.array(img)
-            return img_array
-    
-    @lru_cache(maxsize=32)
-    def extract_dominant_colors(self, image_path, n_colors=5):
-        """提取主要色彩（带缓存）"""
-        # 检查缓存
-        cache_key = f"{image_path}_{n_colors}"
-        if cache_key in self._cache:
-            return self._cache[cache_key]
+        # 未指定时使用进程内共享缓存，跨会话和页面重跑复用结果
+        self._cache = cache
+    
+    def _preprocess_image(self, image, max_size=800):
+        """预处理图片：调整大小和格式
         
-        # 预处理图片
-        image = self._preprocess_image(image_path)
-        pixels = image.reshape(-1, 3)
+        image 可以是图片路径、文件对象、PIL图片或RGB数组。
+        """
+        if isinstance(image, np.ndarray):
+            # 只有 RGB uint8 数组可直接使用，灰度、RGBA 等数组先转换为RGB
+            is_rgb = image.ndim == 3 and image.shape[2] == 3 and image.dtype == np.uint8
+            if is_rgb and max(image.shape[:2]) <= max_size:
+                return image
+            image = Image.fromarray(image)
+        
+        if isinstance(image, Image.Image):
+            return self._image_to_array(image, max_size)
+        
+        with Image.open(image) as img:
+            with timed('color_analyzer.decode'):
+                self._decode(img, max_size)
+            return self._image_to_array(img, max_size)
+    
+    def _decode(self, img, max_size):
+        """解码已打开的图片
+        
+        快速模式下 JPEG 按 1/2、1/4、1/8 在DCT域缩小解码，得到不小于目标
+        尺寸的最小图片，不再解码全尺寸原图。
+        """
+        if self.decode == 'fast' and img.format == 'JPEG' and max(img.size) > max_size:
+            ratio = max_size / max(img.size)
+            img.draft('RGB', tuple(max(1, int(dim * ratio)) for dim in img.size))
+        img.load()
+        return img
+    
+    @timed('color_analyzer.resize')
+    def _image_to_array(self, img, max_size):
+        # 调整图片大小以提高性能
+        if max(img.size) > max_size:
+            ratio = max_size / max(img.size)
+            new_size = tuple(int(dim * ratio) for dim in img.size)
+            resample, reducing_gap = DECODE_MODES[self.decode]
+            img = img.resize(new_size, resample, reducing_gap=reducing_gap)
+        
+        # 转换为RGB模式
+        if img.mode != 'RGB':
+            img = img.convert('RGB')
+        
+        # 转换为numpy数组
+        return np.array(img)
+    
+    @property
+    def cache(self):
+        return self._cache if self._cache is not None else get_shared_cache()
+    
+    def _cached(self, kind, image, params, compute):
+        """按 (图片内容, 分析参数) 读取或写入缓存"""
+        image_key = content_key(image)
+        if image_key is None:
+            return compute()
+        
+        key = (kind, image_key, params)
+        result = self.cache.get(key)
+        if result is None:
+            result = compute()
+            self.cache.put(key, result)
+        return result
+    
+    def _clustering_params(self, n_colors, mode):
+        return (n_colors, mode, self.sample_size, self.histogram_bits, self.decode)
+    
+    @timed('color_analyzer.analyze')
+    def analyze(self, image, n_colors=5, mode=None):
+        """完整分析一幅作品
         
-        # 使用KMeans聚类
+        图片只解码和缩放一次，主要色彩、HSV分布、心理映射和图表数据都
+        基于同一个内存数组计算。
+        """
+        mode = mode or self.mode
+        return self._cached(
+            'analysis', image, self._clustering_params(n_colors, mode),
+            lambda: self._analyze_uncached(image, n_colors, mode)
+        )
+    
+    def _analyze_uncached(self, image, n_colors, mode):
+        array = self._preprocess_image(image)
+        
+        dominant_colors = self._dominant_colors(array, n_colors, mode)
+        base_indices = self.classify_base_colors([color for color, _ in dominant_colors])
+        
+        return ArtworkAnalysis(
+            dominant_colors=dominant_colors,
+            color_distribution=self._color_distribution(array),
+            color_combinations=[BASE_COLOR_NAMES[index] for index in base_indices],
+            psychology=self.analyze_color_psychology(dominant_colors),
+            image_size=(int(array.shape[1]), int(array.shape[0])),
+            mode=mode,
+            embedding=self._color_embedding(array)
+        )
+    
+    def _cluster_kmeans(self, pixels, n_colors):
+        """精确模式：对全部像素执行KMeans"""
+        from sklearn.cluster import KMeans
         kmeans = KMeans(
             n_clusters=n_colors,
             random_state=42,
@@ -71,46 +209,191 @@ class ColorAnalyzer:
             max_iter=100  # 限制最大迭代次数
         )
         kmeans.fit(pixels)
+        return kmeans.cluster_centers_, self._label_fractions(kmeans.labels_, n_colors)
+    
+    def _cluster_minibatch(self, pixels, n_colors):
+        """均衡模式：MiniBatchKMeans，每次迭代只使用一小批像素"""
+        from sklearn.cluster import MiniBatchKMeans
+        kmeans = MiniBatchKMeans(
+            n_clusters=n_colors,
+            random_state=42,
+            n_init=3,
+            max_iter=20,
+            batch_size=4096,
+            max_no_improvement=3  # 惯性不再下降时提前停止
+        )
+        kmeans.fit(pixels)
+        return kmeans.cluster_centers_, self._label_fractions(kmeans.labels_, n_colors)
+    
+    def _cluster_subsample(self, pixels, n_colors):
+        """快速模式：固定种子随机抽样像素后执行KMeans"""
+        if len(pixels) > self.sample_size:
+            rng = np.random.default_rng(42)
+            indices = rng.choice(len(pixels), size=self.sample_size, replace=False)
+            pixels = pixels[indices]
+        return self._cluster_kmeans(pixels, n_colors)
+    
+    def _cluster_histogram(self, pixels, n_colors):
+        """直方图模式：先量化为颜色直方图，再对非空格子做加权KMeans
+
+        儿童画大多是大面积平涂，像素高度重复；量化后只需聚类几百到几千个
+        非空格子，耗时取决于不同颜色的数量而不是图片尺寸。
+        """
+        bits = self.histogram_bits
+        shift = 8 - bits
+        quantized = (pixels >> shift).astype(np.int64)
+        bin_index = (quantized[:, 0] << (2 * bits)) | (quantized[:, 1] << bits) | quantized[:, 2]
+        n_bins = 1 << (3 * bits)
         
-        # 获取主要色彩
-        colors = kmeans.cluster_centers_
+        counts = np.bincount(bin_index, minlength=n_bins)
+        occupied = np.nonzero(counts)[0]
+        weights = counts[occupied].astype(np.float64)
+        
+        # 每个格子取其中像素的平均颜色，而不是格子中心
+        bin_colors = np.column_stack([
+            np.bincount(bin_index, weights=pixels[:, channel], minlength=n_bins)[occupied]
+            for channel in range(3)
+        ]) / weights[:, None]
+        
+        # 颜色种类不超过目标数量时直接返回
+        if len(occupied) <= n_colors:
+            return bin_colors, weights / weights.sum()
+        
+        from sklearn.cluster import KMeans
+        kmeans = KMeans(
+            n_clusters=n_colors,
+            random_state=42,
+            n_init=3,
+            max_iter=100
+        )
+        kmeans.fit(bin_colors, sample_weight=weights)
+        fractions = np.bincount(kmeans.labels_, weights=weights, minlength=n_colors)
+        return kmeans.cluster_centers_, fractions / weights.sum()
+    
+    @staticmethod
+    def _label_fractions(labels, n_colors):
+        """计算每个聚类的像素比例"""
+        return np.bincount(labels, minlength=n_colors) / len(labels)
+    
+    def extract_dominant_colors(self, image_path, n_colors=5, mode=None):
+        """提取主要色彩（带缓存）"""
+        mode = mode or self.mode
+        return self._cached(
+            'dominant_colors', image_path, self._clustering_params(n_colors, mode),
+            lambda: self._dominant_colors(self._preprocess_image(image_path), n_colors, mode)
+        )
+    
+    @timed('color_analyzer.kmeans')
+    def _dominant_colors(self, image, n_colors, mode):
+        """对预处理后的图片数组聚类，返回 [(hex, percentage), ...]"""
+        if mode not in ANALYSIS_MODES:
+            raise ValueError(f"Unknown analysis mode: {mode}")
+        pixels = image.reshape(-1, 3)
         
-        # 计算每个颜色的比例
-        labels = kmeans.labels_
-        counts = np.bincount(labels)
-        percentages = counts / len(labels)
+        # 按模式选择聚类引擎
+        engine = self.clustering_engines[ANALYSIS_MODES[mode]]
+        colors, percentages = engine(pixels, n_colors)
         
         # 将RGB值转换为十六进制颜色代码
         hex_colors = ['#%02x%02x%02x' % tuple(map(int, color)) for color in colors]
-        
-        # 存入缓存
-        result = list(zip(hex_colors, percentages))
-        self._cache[cache_key] = result
-        return result
+        return [(color, float(percentage)) for color, percentage in zip(hex_colors, percentages)]
     
-    @lru_cache(maxsize=32)
-    def analyze_color_distribution(self, image_path):
-        """分析色彩分布（带缓存）"""
-        # 预处理图片
-        image = self._preprocess_image(image_path)
+    def analyze_color_distribution(self, image_path, hue_bins=36, saturation_bins=20, value_bins=20):
+        """分析色彩分布（带缓存）
         
+        返回固定分箱的色相（角度）、饱和度和明度（百分比）直方图以及汇总
+        统计，数据量与图片分辨率无关。
+        """
+        return self._cached(
+            'color_distribution', image_path, (hue_bins, saturation_bins, value_bins, self.decode),
+            lambda: self._color_distribution(
+                self._preprocess_image(image_path), hue_bins, saturation_bins, value_bins
+            )
+        )
+    
+    @timed('color_analyzer.hsv')
+    def _color_distribution(self, image, hue_bins=36, saturation_bins=20, value_bins=20):
+        """基于预处理后的图片数组计算分箱直方图和汇总统计"""
+        import cv2
         # 转换为HSV空间
         hsv = cv2.cvtColor(image, cv2.COLOR_RGB2HSV)
         
-        # 计算分布
-        h, s, v = cv2.split(hsv)
+        # 按OpenCV的原始取值范围计算全分辨率直方图（H: 0-179, S/V: 0-255）
+        hue_counts = cv2.calcHist([hsv], [0], None, [180], [0, 180]).ravel()
+        saturation_counts = cv2.calcHist([hsv], [1], None, [256], [0, 256]).ravel()
+        value_counts = cv2.calcHist([hsv], [2], None, [256], [0, 256]).ravel()
         
-        # 归一化
-        hues = h.flatten() * 2  # 转换为角度
-        saturations = s.flatten() / 255 * 100  # 转换为百分比
-        values = v.flatten() / 255 * 100  # 转换为百分比
+        # 汇总统计直接从全分辨率直方图计算，结果与逐像素计算一致
+        hue_angles = np.deg2rad(np.arange(180) * 2)
+        levels = np.arange(256) / 255 * 100
+        pixel_count = hue_counts.sum()
+        
+        sin_sum = np.dot(hue_counts, np.sin(hue_angles))
+        cos_sum = np.dot(hue_counts, np.cos(hue_angles))
+        
+        return {
+            'hue_distribution': self._rebin(hue_counts, hue_bins, 360),
+            'saturation_distribution': self._rebin(saturation_counts, saturation_bins, 100),
+            'value_distribution': self._rebin(value_counts, value_bins, 100),
+            'summary': {
+                'pixel_count': int(pixel_count),
+                'hue_circular_mean': float(np.rad2deg(np.arctan2(sin_sum, cos_sum)) % 360),
+                'hue_concentration': float(np.hypot(sin_sum, cos_sum) / pixel_count),
+                'hue_entropy': self._entropy(hue_counts),
+                'saturation_mean': float(np.dot(saturation_counts, levels) / pixel_count),
+                'saturation_std': self._histogram_std(saturation_counts, levels),
+                'saturation_entropy': self._entropy(saturation_counts),
+                'value_mean': float(np.dot(value_counts, levels) / pixel_count),
+                'value_std': self._histogram_std(value_counts, levels),
+                'value_entropy': self._entropy(value_counts)
+            }
+        }
+    
+    def color_embedding(self, image_path):
+        """计算定长色彩直方图嵌入（带缓存）"""
+        return self._cached(
+            'embedding', image_path, (EMBEDDING_BINS, self.decode),
+            lambda: self._color_embedding(self._preprocess_image(image_path))
+        )
+    
+    @staticmethod
+    @timed('color_analyzer.embedding')
+    def _color_embedding(image):
+        """HSV联合直方图，归一化后取平方根
         
+        向量间的欧氏距离对应直方图的Hellinger距离，可直接用于
+        KD树/球树检索；长度固定为 EMBEDDING_BINS 各维之积。
+        """
+        import cv2
+        hsv = cv2.cvtColor(image, cv2.COLOR_RGB2HSV)
+        counts = cv2.calcHist(
+            [hsv], [0, 1, 2], None, list(EMBEDDING_BINS), [0, 180, 0, 256, 0, 256]
+        ).ravel()
+        return np.sqrt(counts / counts.sum()).astype(np.float32)
+    
+    @staticmethod
+    def _rebin(counts, n_bins, upper):
+        """将全分辨率直方图合并为 n_bins 个等宽分箱"""
+        edges = np.linspace(0, len(counts), n_bins + 1)
+        bin_index = np.searchsorted(edges, np.arange(len(counts)), side='right') - 1
+        merged = np.bincount(bin_index, weights=counts, minlength=n_bins)
         return {
-            'hue_distribution': hues.tolist(),
-            'saturation_distribution': saturations.tolist(),
-            'value_distribution': values.tolist()
+            'bin_edges': (edges / len(counts) * upper).tolist(),
+            'counts': merged.astype(np.int64).tolist()
         }
     
+    @staticmethod
+    def _entropy(counts):
+        """直方图的香农熵（比特）"""
+        probabilities = counts[counts > 0] / counts.sum()
+        return float(-(probabilities * np.log2(probabilities)).sum())
+    
+    @staticmethod
+    def _histogram_std(counts, levels):
+        mean = np.dot(counts, levels) / counts.sum()
+        return float(np.sqrt(np.dot(counts, (levels - mean) ** 2) / counts.sum()))
+    
+    @timed('color_analyzer.psychology')
     def analyze_color_psychology(self, dominant_colors):
         """分析色彩心理特征"""
         # 初始化特征字典
@@ -120,10 +403,12 @@ class ColorAnalyzer:
         # 将输入转换为元组以确保一致性
         dominant_colors = tuple(dominant_colors)
         
+        # 一次查找整个调色板最接近的基础色彩
+        base_indices = self.classify_base_colors([color for color, _ in dominant_colors])
+        
         # 遍历每个主要色彩
-        for color, percentage in dominant_colors:
-            # 找到最接近的基础色彩
-            base_color = self.find_nearest_base_color(color)
+        for (color, percentage), base_index in zip(dominant_colors, base_indices):
+            base_color = BASE_COLOR_NAMES[base_index]
             if base_color in self.color_psychology:
                 # 为每个情绪特征累加权重
                 for emotion in self.color_psychology[base_color]['emotions']:
@@ -157,58 +442,193 @@ class ColorAnalyzer:
             'traits': traits
         }
     
-    def generate_visualization(self, image_path):
+    def generate_visualization(self, image_path, dominant_colors=None):
         """生成可视化分析图表"""
-        # 使用缓存的主要色彩数据
-        dominant_colors = self.extract_dominant_colors(image_path)
-        
-        # 创建饼图
-        colors, percentages = zip(*dominant_colors)
-        fig = go.Figure(data=[go.Pie(
-            labels=[f'Color {i+1}' for i in range(len(colors))],
-            values=percentages,
-            marker=dict(colors=colors),
-            hole=.3
-        )])
-        
-        fig.update_layout(
-            title="主要色彩分布",
-            showlegend=True,
-            height=400  # 减小图表高度以提高加载速度
-        )
-        
-        return fig
+        # 优先使用已存储的主要色彩数据
+        if dominant_colors is None:
+            dominant_colors = self.extract_dominant_colors(image_path)
+        return palette_figure(dominant_colors)
     
     @staticmethod
     def find_nearest_base_color(hex_color):
-        """找到最接近的基础色彩（使用预计算的颜色距离）"""
-        def hex_to_rgb(hex_str):
-            hex_str = hex_str.lstrip('#')
-            return tuple(int(hex_str[i:i+2], 16) for i in (0, 2, 4))
-        
-        def color_distance(c1, c2):
-            """计算两个RGB颜色之间的欧氏距离"""
-            r1, g1, b1 = c1
-            r2, g2, b2 = c2
-            return ((r1 - r2) ** 2 + (g1 - g2) ** 2 + (b1 - b2) ** 2) ** 0.5
-        
-        # 基础色彩映射（使用预计算的RGB值）
-        base_colors = {
-            'red': (255, 0, 0),
-            'blue': (0, 0, 255),
-            'yellow': (255, 255, 0),
-            'green': (0, 255, 0),
-            'purple': (128, 0, 128)
-        }
+        """找到最接近的基础色彩（使用预计算的颜色查找表）
+        
+        单个颜色直接按打包的RGB值查表，不经过数组转换；批量查找请使用
+        classify_base_colors。
+        """
+        value = int(hex_color.lstrip('#'), 16)
+        r, g, b = (value >> 16) & 0xFF, (value >> 8) & 0xFF, value & 0xFF
+        shift = 8 - _LUT_BITS
+        index = int(_get_base_color_lut()[r >> shift, g >> shift, b >> shift])
+        if index == _LUT_BOUNDARY:
+            index = min(
+                range(len(BASE_COLOR_NAMES)),
+                key=lambda i: sum((c - base) ** 2 for c, base in zip((r, g, b), _BASE_COLOR_TUPLES[i]))
+            )
+        return BASE_COLOR_NAMES[index]
+    
+    @staticmethod
+    def classify_base_colors(colors):
+        """批量查找最接近的基础色彩
+        
+        colors 可以是十六进制颜色列表或 N×3 的RGB数组，返回
+        BASE_COLOR_NAMES 中的下标数组。
+        """
+        rgb = hex_to_rgb_array(colors) if _is_hex_sequence(colors) else np.asarray(colors)
+        rgb = np.clip(np.rint(rgb), 0, 255).astype(np.intp).reshape(-1, 3)
+        quantized = rgb >> (8 - _LUT_BITS)
+        indices = _get_base_color_lut()[quantized[:, 0], quantized[:, 1], quantized[:, 2]]
         
-        # 将输入颜色转换为RGB
-        input_rgb = hex_to_rgb(hex_color)
+        # 跨越分界的格子逐个精确计算，保证结果与直接求最近距离一致
+        boundary = indices == _LUT_BOUNDARY
+        if boundary.any():
+            distances = ((rgb[boundary, None, :] - BASE_COLOR_RGB) ** 2).sum(axis=-1)
+            indices[boundary] = distances.argmin(axis=-1)
+        return indices
+    
+    def analyze_color_psychology_batch(self, palettes):
+        """批量分析色彩心理特征
+        
+        palettes 为多个作品的 [(hex, percentage), ...] 列表，返回情绪/性格
+        名称以及 作品数 × 特征数 的权重矩阵（与 analyze_color_psychology 相同，
+        每个特征取对应色彩的最大比例）。
+        """
+        emotion_names, emotion_map = self._feature_matrix('emotions')
+        trait_names, trait_map = self._feature_matrix('traits')
+        
+        # 展开所有作品的调色板
+        artwork_index = np.repeat(
+            np.arange(len(palettes)),
+            [len(palette) for palette in palettes]
+        )
+        entries = [entry for palette in palettes for entry in palette]
+        base_max = np.zeros((len(palettes), len(BASE_COLOR_NAMES)))
+        if entries:
+            base_index = self.classify_base_colors([color for color, _ in entries])
+            percentages = np.array([percentage for _, percentage in entries], dtype=np.float64)
+            np.maximum.at(base_max, (artwork_index, base_index), percentages)
         
-        # 计算与每个基础色彩的距离
-        distances = {
-            color_name: color_distance(input_rgb, rgb_value)
-            for color_name, rgb_value in base_colors.items()
+        return {
+            'emotions': emotion_names,
+            'emotion_weights': (base_max[:, :, None] * emotion_map[None]).max(axis=1),
+            'traits': trait_names,
+            'trait_weights': (base_max[:, :, None] * trait_map[None]).max(axis=1)
         }
+    
+    def _feature_matrix(self, feature):
+        """构建 基础色彩 × 特征 的映射矩阵"""
+        names = []
+        for base_color in BASE_COLOR_NAMES:
+            for name in self.color_psychology.get(base_color, {}).get(feature, []):
+                if name not in names:
+                    names.append(name)
+        
+        matrix = np.zeros((len(BASE_COLOR_NAMES), len(names)))
+        for row, base_color in enumerate(BASE_COLOR_NAMES):
+            for name in self.color_psychology.get(base_color, {}).get(feature, []):
+                matrix[row, names.index(name)] = 1.0
+        return names, matrix
+
+
+# 基础色彩（顺序即 classify_base_colors 返回的下标）
+BASE_COLOR_NAMES = ('red', 'blue', 'yellow', 'green', 'purple')
+BASE_COLOR_RGB = np.array([
+    (255, 0, 0),
+    (0, 0, 255),
+    (255, 255, 0),
+    (0, 255, 0),
+    (128, 0, 128)
+], dtype=np.float32)
+_BASE_COLOR_TUPLES = [tuple(int(c) for c in rgb) for rgb in BASE_COLOR_RGB]
+
+# 查找表每个通道的量化位数（64级，共262144项，每项1字节）
+_LUT_BITS = 6
+# 格子内最近基础色彩不唯一时的标记
+_LUT_BOUNDARY = 255
+_base_color_lut = None
+
+
+def _get_base_color_lut():
+    """按需构建量化RGB到基础色彩下标的查找表
+    
+    最近邻区域是凸的，格子8个顶点的最近基础色彩相同时整个格子都相同；
+    否则标记为 _LUT_BOUNDARY，查询时再精确计算。
+    """
+    global _base_color_lut
+    if _base_color_lut is None:
+        size = 1 << _LUT_BITS
+        step = 256 // size
+        vertices = np.arange(0, 256 + step, step, dtype=np.float32)
+        grid = np.stack(np.meshgrid(vertices, vertices, vertices, indexing='ij'), axis=-1)
+        nearest = ((grid[..., None, :] - BASE_COLOR_RGB) ** 2).sum(axis=-1).argmin(axis=-1)
         
-        # 返回距离最近的基础色彩
-        return min(distances.items(), key=lambda x: x[1])[0]
\ No newline at end of file
+        lut = nearest[:size, :size, :size].astype(np.uint8)
+        for dr in (0, 1):
+            for dg in (0, 1):
+                for db in (0, 1):
+                    corner = nearest[dr:dr + size, dg:dg + size, db:db + size]
+                    lut[corner != lut] = _LUT_BOUNDARY
+        _base_color_lut = lut
+    return _base_color_lut
+
+
+def _is_hex_sequence(colors):
+    return len(colors) > 0 and isinstance(colors[0], str)
+
+
+def hex_to_rgb_array(hex_colors):
+    """将十六进制颜色列表转换为 N×3 的RGB数组"""
+    values = np.array([int(color.lstrip('#'), 16) for color in hex_colors], dtype=np.int64)
+    return np.column_stack([(values >> 16) & 0xFF, (values >> 8) & 0xFF, values & 0xFF])
+
+def palette_figure(dominant_colors):
+    """根据主要色彩创建饼图"""
+    import plotly.graph_objects as go
+    colors, percentages = zip(*dominant_colors)
+    fig = go.Figure(data=[go.Pie(
+        labels=[f'Color {i+1}' for i in range(len(colors))],
+        values=percentages,
+        marker=dict(colors=colors),
+        hole=.3
+    )])
+    
+    fig.update_layout(
+        title="主要色彩分布",
+        showlegend=True,
+        height=400  # 减小图表高度以提高加载速度
+    )
+    
+    return fig
+
+
+def palette_drift(reference, candidate):
+    """计算两个调色板之间的偏差
+
+    按RGB距离对两组色彩做最优一一匹配，返回按参考比例加权的平均
+    RGB距离（0-441）以及比例偏差（0-1，两组比例差的一半之和）。
+    """
+    from scipy.optimize import linear_sum_assignment
+
+    def to_arrays(palette):
+        rgb = np.array([
+            [int(color.lstrip('#')[i:i+2], 16) for i in (0, 2, 4)]
+            for color, _ in palette
+        ], dtype=np.float64)
+        weights = np.array([percentage for _, percentage in palette], dtype=np.float64)
+        return rgb, weights
+
+    ref_rgb, ref_weights = to_arrays(reference)
+    cand_rgb, cand_weights = to_arrays(candidate)
+
+    distances = np.linalg.norm(ref_rgb[:, None, :] - cand_rgb[None, :, :], axis=2)
+    rows, cols = linear_sum_assignment(distances)
+
+    color_distance = float(
+        np.sum(distances[rows, cols] * ref_weights[rows]) / ref_weights[rows].sum()
+    )
+    percentage_error = float(np.abs(ref_weights[rows] - cand_weights[cols]).sum() / 2)
+
+    return {
+        'color_distance': color_distance,
+        'percentage_error': percentage_error
+    }
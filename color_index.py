@@ -0,0 +1,134 @@
+import json
+import argparse
+import numpy as np
+from color_analyzer import ColorAnalyzer, BASE_COLOR_NAMES, hex_to_rgb_array
+from database_setup import create_database
+from db_connection import get_database
+from data_importer import ArtworkImporter
+
+# 明度（HSL中的L）和饱和度（HSV中的S）分档：(上限, 名称)
+LIGHTNESS_BANDS = [(0.35, 'dark'), (0.7, 'medium'), (1.0, 'light')]
+SATURATION_BANDS = [(0.4, 'muted'), (1.0, 'vivid')]
+
+BASE_COLOR_LABELS = {'red': '红', 'blue': '蓝', 'yellow': '黄', 'green': '绿', 'purple': '紫'}
+LIGHTNESS_LABELS = {'dark': '深', 'medium': '中', 'light': '浅'}
+SATURATION_LABELS = {'muted': '灰', 'vivid': '艳'}
+
+
+def _band(values, bands):
+    """按分档上限把 0-1 的取值映射为分档名称"""
+    limits = np.array([limit for limit, _ in bands[:-1]])
+    return [bands[index][1] for index in np.searchsorted(limits, values, side='right')]
+
+
+def color_buckets(dominant_colors):
+    """把主要色彩量化为稳定的色彩桶，返回 {桶: 覆盖比例}
+
+    每个色彩计入两级桶：基础色彩（如 red）以及 基础色彩-明度-饱和度
+    （如 red-light-vivid），同一桶内的比例累加。
+    """
+    if not dominant_colors:
+        return {}
+    colors = [color for color, _ in dominant_colors]
+    rgb = hex_to_rgb_array(colors) / 255.0
+    high = rgb.max(axis=1)
+    low = rgb.min(axis=1)
+    lightness = _band((high + low) / 2, LIGHTNESS_BANDS)
+    saturation = _band(np.divide(high - low, high, out=np.zeros_like(high), where=high > 0),
+                       SATURATION_BANDS)
+
+    buckets = {}
+    base_indices = ColorAnalyzer.classify_base_colors(colors)
+    for (_, percentage), index, light, sat in zip(dominant_colors, base_indices, lightness, saturation):
+        base = BASE_COLOR_NAMES[index]
+        for bucket in (base, f"{base}-{light}-{sat}"):
+            buckets[bucket] = buckets.get(bucket, 0.0) + float(percentage)
+    return buckets
+
+
+def all_buckets():
+    """全部色彩桶（基础色彩在前）"""
+    buckets = list(BASE_COLOR_NAMES)
+    for base in BASE_COLOR_NAMES:
+        for _, light in LIGHTNESS_BANDS:
+            for _, sat in SATURATION_BANDS:
+                buckets.append(f"{base}-{light}-{sat}")
+    return buckets
+
+
+def bucket_label(bucket):
+    """色彩桶的中文名称，如 red-light-vivid -> 浅艳红"""
+    parts = bucket.split('-')
+    if len(parts) == 1:
+        return BASE_COLOR_LABELS[bucket]
+    base, light, sat = parts
+    return f"{LIGHTNESS_LABELS[light]}{SATURATION_LABELS[sat]}{BASE_COLOR_LABELS[base]}"
+
+
+def write_color_index(cursor, artwork_id, dominant_colors):
+    """在写事务中更新作品的倒排索引行（替换旧值）"""
+    cursor.execute('DELETE FROM color_index WHERE artwork_id = ?', (artwork_id,))
+    cursor.executemany(
+        'INSERT INTO color_index (bucket, artwork_id, coverage) VALUES (?, ?, ?)',
+        [(bucket, artwork_id, coverage) for bucket, coverage in color_buckets(dominant_colors).items()]
+    )
+
+
+def rebuild_color_index(cursor):
+    """按已存储的分析结果重建倒排索引（无需重新处理像素）"""
+    cursor.execute('DELETE FROM color_index')
+    rows = cursor.execute('''
+        SELECT artwork_id, dominant_colors FROM color_analysis
+        WHERE analysis_id IN (SELECT MAX(analysis_id) FROM color_analysis GROUP BY artwork_id)
+    ''').fetchall()
+    for artwork_id, dominant_colors in rows:
+        write_color_index(cursor, artwork_id, json.loads(dominant_colors))
+    return len(rows)
+
+
+class ColorIndex:
+    """色彩桶倒排索引：色彩桶 -> (作品ID, 覆盖比例)"""
+
+    def __init__(self, db_path='artwork_database.db'):
+        self.db_path = db_path
+        create_database(db_path)
+        self.db = get_database(db_path)
+
+    def rebuild(self):
+        return self.db.write(lambda conn: rebuild_color_index(conn.cursor()))
+
+    def artwork_buckets(self, artwork_id):
+        """作品的色彩桶及覆盖比例，按比例从高到低"""
+        _, rows = self.db.query('''
+            SELECT bucket, coverage FROM color_index
+            WHERE artwork_id = ?
+            ORDER BY coverage DESC
+        ''', (artwork_id,))
+        return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="色彩桶倒排索引")
+    parser.add_argument('--db', default='artwork_database.db', help="数据库路径")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    subparsers.add_parser('rebuild', help="按已存储的分析结果重建索引")
+
+    query = subparsers.add_parser('query', help="查询使用某色彩桶的作品")
+    query.add_argument('bucket', choices=all_buckets(), help="色彩桶，如 red 或 red-light-vivid")
+    query.add_argument('--min-coverage', type=float, default=0.3, help="最低覆盖比例")
+    args = parser.parse_args()
+
+    if args.command == 'rebuild':
+        print(f"已重建 {ColorIndex(args.db).rebuild()} 件作品的色彩索引")
+    elif args.command == 'query':
+        artworks = ArtworkImporter(args.db).get_all_artworks(
+            {'color': (args.bucket, args.min_coverage)}
+        )
+        for artwork in artworks:
+            print(f"作品 #{artwork['artwork_id']}: {artwork['image_path']}")
+        print(f"{bucket_label(args.bucket)} 覆盖 ≥{args.min_coverage:.0%} 的作品共 {len(artworks)} 件")
+
+
+if __name__ == "__main__":
+    main()
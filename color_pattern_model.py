@@ -0,0 +1,262 @@
+import os
+import json
+import pickle
+import argparse
+from datetime import datetime
+import numpy as np
+from color_analyzer import hex_to_rgb_array
+from database_setup import create_database
+from db_connection import get_database
+
+MODEL_DIR = 'data/models'
+MODEL_NAME = 'color_patterns'
+# 模型文件格式版本：文件中保存的是状态字典而不是类实例，
+# 以 python color_pattern_model.py 保存的模型也能在其他模块中加载
+MODEL_FORMAT = 2
+
+
+def model_pointer_path(model_dir=MODEL_DIR):
+    return os.path.join(model_dir, f"{MODEL_NAME}_latest.json")
+
+
+def latest_model_info(model_dir=MODEL_DIR):
+    """读取当前模型的元数据，没有模型时返回 None"""
+    try:
+        with open(model_pointer_path(model_dir), encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def load_palettes(db_path, seen_artworks=()):
+    """读取已存储的主要色彩，返回 (调色板列表, 对应的作品ID列表)
+
+    seen_artworks 中的作品跳过。重新分析会删除旧记录并以新的分析ID写入，
+    因此按作品而不是按分析ID判断是否已用于拟合。
+    """
+    create_database(db_path)
+    _, rows = get_database(db_path).query('''
+        SELECT artwork_id, dominant_colors FROM color_analysis
+        ORDER BY analysis_id
+    ''')
+    palettes = []
+    artwork_ids = []
+    for artwork_id, dominant_colors in rows:
+        if artwork_id in seen_artworks:
+            continue
+        palettes.append(json.loads(dominant_colors))
+        artwork_ids.append(artwork_id)
+    return palettes, artwork_ids
+
+
+class ColorPatternModel:
+    """语料级色彩模式模型
+
+    在全部作品的主要色彩上拟合一次 StandardScaler + MiniBatchKMeans，
+    按版本保存到 data/models；单幅作品只做批量 predict，不再临时拟合。
+    每个主要色彩按其占比加权。
+    """
+
+    def __init__(self, n_clusters=8, random_state=42):
+        self.n_clusters = n_clusters
+        self.random_state = random_state
+        self.scaler = None
+        self.kmeans = None
+        self.version = None
+        self.n_samples = 0
+        self.seen_artworks = set()  # 已用于拟合的作品ID
+        self.fitted_at = None
+
+    @staticmethod
+    def _features(palettes):
+        """把多个调色板展平为 (RGB矩阵, 占比权重, 每个调色板的色彩数)"""
+        colors = [color for palette in palettes for color, _ in palette]
+        weights = np.array(
+            [percentage for palette in palettes for _, percentage in palette], dtype=np.float64
+        )
+        lengths = [len(palette) for palette in palettes]
+        rgb = hex_to_rgb_array(colors).astype(np.float64) if colors else np.empty((0, 3))
+        return rgb, weights, lengths
+
+    def fit(self, palettes, sample_size=None, artwork_ids=()):
+        """在调色板集合（或其随机样本）上重新拟合
+
+        artwork_ids 为 palettes 对应的作品，抽样时也全部记为已拟合。
+        """
+        if sample_size is not None and len(palettes) > sample_size:
+            rng = np.random.default_rng(self.random_state)
+            palettes = [palettes[i] for i in rng.choice(len(palettes), sample_size, replace=False)]
+
+        from sklearn.cluster import MiniBatchKMeans
+        from sklearn.preprocessing import StandardScaler
+
+        rgb, weights, _ = self._features(palettes)
+        if len(rgb) < self.n_clusters:
+            raise ValueError(f"Not enough colors to fit {self.n_clusters} clusters: {len(rgb)}")
+
+        self.scaler = StandardScaler().fit(rgb)
+        self.kmeans = MiniBatchKMeans(
+            n_clusters=self.n_clusters,
+            random_state=self.random_state,
+            n_init=3,
+            batch_size=4096
+        )
+        self.kmeans.fit(self.scaler.transform(rgb), sample_weight=weights)
+        self.n_samples = len(palettes)
+        self.seen_artworks = set(artwork_ids)
+        return self
+
+    def partial_fit(self, palettes, artwork_ids=()):
+        """用新作品增量更新聚类中心
+
+        标准化参数保持不变，保证已有中心仍处于同一特征空间。
+        """
+        if self.kmeans is None:
+            return self.fit(palettes, artwork_ids=artwork_ids)
+
+        rgb, weights, _ = self._features(palettes)
+        if len(rgb):
+            self.kmeans.partial_fit(self.scaler.transform(rgb), sample_weight=weights)
+            self.n_samples += len(palettes)
+        self.seen_artworks.update(artwork_ids)
+        return self
+
+    def predict(self, dominant_colors):
+        """预测单个调色板中每个色彩所属的色彩模式"""
+        return self.predict_many([dominant_colors])[0]
+
+    def predict_many(self, palettes):
+        """批量预测：所有调色板的色彩合并为一次 predict 调用"""
+        rgb, _, lengths = self._features(palettes)
+        if not len(rgb):
+            return [np.empty(0, dtype=np.int64) for _ in palettes]
+        labels = self.kmeans.predict(self.scaler.transform(rgb))
+        return np.split(labels, np.cumsum(lengths)[:-1])
+
+    def save(self, model_dir=MODEL_DIR):
+        """保存为新版本并更新最新版本指针，返回版本号"""
+        import sklearn
+        os.makedirs(model_dir, exist_ok=True)
+        current = latest_model_info(model_dir)
+        self.version = (current['version'] if current else 0) + 1
+        self.fitted_at = datetime.now().isoformat(timespec='seconds')
+
+        filename = f"{MODEL_NAME}_v{self.version}.pkl"
+        path = os.path.join(model_dir, filename)
+        with open(path + '.tmp', 'wb') as f:
+            pickle.dump(self._state(sklearn.__version__), f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(path + '.tmp', path)
+
+        info = {
+            'version': self.version,
+            'file': filename,
+            'n_clusters': self.n_clusters,
+            'n_samples': self.n_samples,
+            'n_artworks': len(self.seen_artworks),
+            'fitted_at': self.fitted_at,
+            'sklearn_version': sklearn.__version__
+        }
+        pointer = model_pointer_path(model_dir)
+        with open(pointer + '.tmp', 'w', encoding='utf-8') as f:
+            json.dump(info, f, ensure_ascii=False, indent=2)
+        os.replace(pointer + '.tmp', pointer)
+        return self.version
+
+    def _state(self, sklearn_version):
+        """可序列化的模型状态（只包含 sklearn 对象和基本类型）"""
+        return {
+            'format': MODEL_FORMAT,
+            'n_clusters': self.n_clusters,
+            'random_state': self.random_state,
+            'scaler': self.scaler,
+            'kmeans': self.kmeans,
+            'version': self.version,
+            'n_samples': self.n_samples,
+            'seen_artworks': sorted(self.seen_artworks),
+            'fitted_at': self.fitted_at,
+            'sklearn_version': sklearn_version
+        }
+
+    @classmethod
+    def _from_state(cls, state):
+        if not isinstance(state, dict) or state.get('format') != MODEL_FORMAT:
+            raise ValueError("Unsupported color pattern model format")
+        model = cls(n_clusters=state['n_clusters'], random_state=state['random_state'])
+        model.scaler = state['scaler']
+        model.kmeans = state['kmeans']
+        model.version = state['version']
+        model.n_samples = state['n_samples']
+        model.seen_artworks = set(state['seen_artworks'])
+        model.fitted_at = state['fitted_at']
+        return model
+
+    @classmethod
+    def load(cls, model_dir=MODEL_DIR, version=None):
+        """加载指定版本（默认最新版本），没有模型时返回 None"""
+        if version is None:
+            info = latest_model_info(model_dir)
+            if info is None:
+                return None
+            filename = info['file']
+        else:
+            filename = f"{MODEL_NAME}_v{version}.pkl"
+
+        path = os.path.join(model_dir, filename)
+        if not os.path.exists(path):
+            return None
+        with open(path, 'rb') as f:
+            return cls._from_state(pickle.load(f))
+
+
+def refit(db_path='artwork_database.db', model_dir=MODEL_DIR, n_clusters=8,
+          sample_size=None, incremental=False, min_growth=0.0):
+    """重新拟合（或增量更新）模型并保存新版本
+
+    min_growth 为触发更新所需的作品增长比例（相对上次拟合），用于定时任务；
+    未达到时不保存，返回 None。
+    """
+    model = ColorPatternModel.load(model_dir) if incremental or min_growth else None
+
+    if model is not None:
+        palettes, artwork_ids = load_palettes(db_path, model.seen_artworks)
+        if len(palettes) < max(1, min_growth * model.n_samples):
+            return None
+        if incremental:
+            model.partial_fit(palettes, artwork_ids)
+            model.save(model_dir)
+            return model
+
+    palettes, artwork_ids = load_palettes(db_path)
+    model = ColorPatternModel(n_clusters=n_clusters)
+    model.fit(palettes, sample_size=sample_size, artwork_ids=artwork_ids)
+    model.save(model_dir)
+    return model
+
+
+def main():
+    parser = argparse.ArgumentParser(description="拟合语料级色彩模式模型")
+    parser.add_argument('--db', default='artwork_database.db', help="数据库路径")
+    parser.add_argument('--model-dir', default=MODEL_DIR, help="模型保存目录")
+    parser.add_argument('--clusters', type=int, default=8, help="色彩模式数量")
+    parser.add_argument('--sample', type=int, default=None, help="最多使用的作品数（随机抽样）")
+    parser.add_argument('--incremental', action='store_true', help="只用新分析的作品增量更新")
+    parser.add_argument('--min-growth', type=float, default=0.0,
+                        help="新增作品达到上次拟合作品数的该比例时才更新（定时任务使用）")
+    args = parser.parse_args()
+
+    model = refit(
+        db_path=args.db,
+        model_dir=args.model_dir,
+        n_clusters=args.clusters,
+        sample_size=args.sample,
+        incremental=args.incremental,
+        min_growth=args.min_growth
+    )
+    if model is None:
+        print("新增作品不足，模型未更新")
+    else:
+        print(f"已保存模型 v{model.version}: {model.n_samples} 件作品, {model.n_clusters} 种色彩模式")
+
+
+if __name__ == "__main__":
+    main()
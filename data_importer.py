@@ -1,27 +1,98 @@
+import io
 import os
 import json
-import sqlite3
-from datetime import datetime
+import numpy as np
 from PIL import Image
-import shutil
+import hashlib
+import csv
+import time
+import argparse
+import tempfile
+import threading
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from database_setup import create_database
+from db_connection import get_database
+from report_aggregates import update_artwork_aggregates
+from metrics import timed
+from canonical_arrays import ARRAY_DIR, array_path, decode_canonical, write_canonical_array
+
+# 批量导入清单的字段
+CHILD_FIELDS = ['age', 'gender', 'location', 'education_setting']
+ARTWORK_FIELDS = ['creation_date', 'medium', 'artwork_theme', 'creation_setting', 'emotional_state']
+
+# 本进程中已存储、尚未写库或清理的图片（按内容哈希计数）；
+# 存储和清理都在锁内进行，避免清理掉其他导入刚复用的文件
+_pending_hashes = Counter()
+_pending_lock = threading.Lock()
+
+
+def read_manifest(manifest_path):
+    """读取批量导入清单（CSV或JSONL），返回字典列表"""
+    with open(manifest_path, 'r', encoding='utf-8-sig', newline='') as f:
+        if manifest_path.lower().endswith(('.jsonl', '.json')):
+            return [json.loads(line) for line in f if line.strip()]
+        return list(csv.DictReader(f))
+
 
 class ArtworkImporter:
+    # 缩略图最长边（像素）
+    THUMBNAIL_SIZE = 320
+    # 按原始字节直接保存的图片格式及扩展名（MPO 为带多帧信息的手机照片，本身就是JPEG）；
+    # 其他格式无损转换为PNG后保存
+    STORED_FORMATS = {'JPEG': 'jpeg', 'MPO': 'jpeg', 'PNG': 'png'}
+    
     def __init__(self, db_path='artwork_database.db'):
         self.db_path = db_path
         self.raw_images_dir = 'data/raw_images'
         self.processed_images_dir = 'data/processed_images'
+        self.thumbnails_dir = 'data/thumbnails'
+        self.arrays_dir = ARRAY_DIR
         
         # 确保必要的目录存在
-        for directory in [self.raw_images_dir, self.processed_images_dir]:
+        for directory in [self.raw_images_dir, self.processed_images_dir, self.thumbnails_dir, self.arrays_dir]:
             os.makedirs(directory, exist_ok=True)
+        
+        # 确保表和索引存在
+        create_database(db_path)
+        self.db = get_database(db_path)
     
     def connect_db(self):
-        return sqlite3.connect(self.db_path)
+        """当前线程共享的只读连接（写操作请通过 self.db.write 提交）"""
+        return self.db.read_connection()
+    
+    @staticmethod
+    def _as_source(image):
+        """统一图片来源：路径原样返回，字节串包装为内存文件，文件对象回到开头
+        
+        不可定位的流先读入内存，保证校验、哈希、缩略图和标准数组可以各自
+        从头读取同一份内容。
+        """
+        if isinstance(image, (str, os.PathLike)):
+            return image
+        if isinstance(image, (bytes, bytearray, memoryview)):
+            return io.BytesIO(image)
+        if not image.seekable():
+            return io.BytesIO(image.read())
+        image.seek(0)
+        return image
     
+    @staticmethod
+    def _reencode_png(source):
+        """把不直接保存的格式无损转换为PNG（内存中完成），返回内存文件"""
+        buffer = io.BytesIO()
+        with Image.open(source) as img:
+            if img.mode not in ('RGB', 'RGBA', 'L', 'LA', 'P'):
+                img = img.convert('RGB')
+            img.save(buffer, format='PNG')
+        buffer.seek(0)
+        return buffer
+    
+    @timed('importer.validate')
     def validate_image(self, image_path):
-        """验证图片文件"""
+        """验证图片（路径、字节串或文件对象）"""
         try:
-            with Image.open(image_path) as img:
+            with Image.open(self._as_source(image_path)) as img:
                 # 获取图片信息
                 width, height = img.size
                 format = img.format
@@ -29,91 +100,294 @@ class ArtworkImporter:
         except Exception as e:
             return False, str(e), None
     
+    def thumbnail_path_for(self, image_path):
+        """图片对应的缩略图路径"""
+        name = os.path.splitext(os.path.basename(image_path))[0]
+        return os.path.join(self.thumbnails_dir, f"{name}.jpg")
+    
+    @timed('importer.thumbnail')
+    def create_thumbnail(self, image_path, source=None):
+        """生成缩略图（JPEG），返回缩略图路径
+        
+        source 为内存中的同一图片内容时直接从中解码，不再读取已保存的文件；
+        也可以是已解码的RGB数组（如导入时的标准数组）。
+        """
+        thumbnail_path = self.thumbnail_path_for(image_path)
+        
+        if isinstance(source, np.ndarray):
+            img = Image.fromarray(source)
+            img.thumbnail((self.THUMBNAIL_SIZE, self.THUMBNAIL_SIZE))
+            img.save(thumbnail_path, format='JPEG', quality=80, optimize=True)
+            return thumbnail_path
+        
+        with Image.open(self._as_source(source) if source is not None else image_path) as img:
+            # JPEG按缩小比例直接解码，避免先解码全尺寸原图
+            img.draft('RGB', (self.THUMBNAIL_SIZE, self.THUMBNAIL_SIZE))
+            if img.mode != 'RGB':
+                img = img.convert('RGB')
+            img.thumbnail((self.THUMBNAIL_SIZE, self.THUMBNAIL_SIZE))
+            img.save(thumbnail_path, format='JPEG', quality=80, optimize=True)
+        
+        return thumbnail_path
+    
+    def ensure_thumbnail(self, artwork):
+        """返回作品缩略图路径，缺失时补生成并记录到数据库"""
+        thumbnail_path = artwork.get('thumbnail_path')
+        if thumbnail_path and os.path.exists(thumbnail_path):
+            return thumbnail_path
+        
+        thumbnail_path = self.create_thumbnail(artwork['image_path'])
+        self.db.execute_write(
+            'UPDATE artworks SET thumbnail_path = ? WHERE artwork_id = ?',
+            (thumbnail_path, artwork['artwork_id'])
+        )
+        return thumbnail_path
+    
+    def backfill_thumbnails(self):
+        """为缺少缩略图的已有作品补生成缩略图，返回 (成功数, 失败列表)"""
+        _, rows = self.db.query('SELECT artwork_id, image_path, thumbnail_path FROM artworks')
+        
+        created = 0
+        errors = []
+        for artwork_id, image_path, thumbnail_path in rows:
+            if thumbnail_path and os.path.exists(thumbnail_path):
+                continue
+            try:
+                self.ensure_thumbnail({
+                    'artwork_id': artwork_id,
+                    'image_path': image_path,
+                    'thumbnail_path': thumbnail_path
+                })
+                created += 1
+            except Exception as e:
+                errors.append((artwork_id, str(e)))
+        return created, errors
+    
+    @staticmethod
+    def _insert_child(conn, child_data):
+        cursor = conn.execute('''
+            INSERT INTO children (age, gender, location, education_setting)
+            VALUES (?, ?, ?, ?)
+        ''', (
+            child_data['age'],
+            child_data['gender'],
+            child_data['location'],
+            child_data['education_setting']
+        ))
+        return cursor.lastrowid
+    
+    @staticmethod
+    def _insert_artwork(conn, artwork_data, stored):
+        cursor = conn.execute('''
+            INSERT INTO artworks (
+                child_id, creation_date, image_path, image_hash, thumbnail_path, dimensions,
+                medium, artwork_theme, creation_setting, emotional_state
+            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ''', (
+            artwork_data['child_id'],
+            artwork_data['creation_date'],
+            stored['image_path'],
+            stored['image_hash'],
+            stored['thumbnail_path'],
+            stored['dimensions'],
+            artwork_data['medium'],
+            artwork_data['artwork_theme'],
+            artwork_data['creation_setting'],
+            artwork_data['emotional_state']
+        ))
+        update_artwork_aggregates(conn, [cursor.lastrowid])
+        return cursor.lastrowid
+    
     def import_child_data(self, child_data):
         """导入儿童信息"""
-        conn = self.connect_db()
-        cursor = conn.cursor()
+        return self.db.write(lambda conn: self._insert_child(conn, child_data))
+    
+    def content_path(self, image_hash, extension):
+        """按内容哈希计算图片存储路径（按哈希前缀分两级目录）"""
+        return os.path.join(
+            self.processed_images_dir,
+            image_hash[:2],
+            image_hash[2:4],
+            f"{image_hash}.{extension}"
+        )
+    
+    @timed('importer.store_image')
+    def store_image(self, image_path, extension, chunk_size=1 << 20):
+        """按内容存储图片：边复制边计算哈希，相同内容只保留一份
+        
+        image_path 可以是路径、字节串或文件对象，内容只写入一次。
+        返回 (存储路径, 内容哈希, 是否为新文件)。存储的图片记为待写库，
+        调用方写库后须调用 _release_stored 或 _discard_stored。
+        """
+        source = self._as_source(image_path)
+        fd, tmp_path = tempfile.mkstemp(dir=self.processed_images_dir, suffix='.tmp')
+        sha256 = hashlib.sha256()
         try:
-            cursor.execute('''
-                INSERT INTO children (age, gender, location, education_setting)
-                VALUES (?, ?, ?, ?)
-            ''', (
-                child_data['age'],
-                child_data['gender'],
-                child_data['location'],
-                child_data['education_setting']
-            ))
-            child_id = cursor.lastrowid
-            conn.commit()
-            return child_id
-        except Exception as e:
-            conn.rollback()
-            raise e
-        finally:
-            conn.close()
+            with os.fdopen(fd, 'wb') as dst:
+                src = open(source, 'rb') if isinstance(source, (str, os.PathLike)) else source
+                try:
+                    for chunk in iter(lambda: src.read(chunk_size), b''):
+                        sha256.update(chunk)
+                        dst.write(chunk)
+                finally:
+                    if src is not source:
+                        src.close()
+            
+            image_hash = sha256.hexdigest()
+            stored_path = self.content_path(image_hash, extension)
+            
+            with _pending_lock:
+                _pending_hashes[image_hash] += 1
+                # 相同内容已存在时直接复用
+                if os.path.exists(stored_path):
+                    os.remove(tmp_path)
+                    return stored_path, image_hash, False
+                
+                os.makedirs(os.path.dirname(stored_path), exist_ok=True)
+                os.replace(tmp_path, stored_path)
+                return stored_path, image_hash, True
+        
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
     
-    def import_artwork(self, artwork_data, image_path):
-        """导入艺术作品"""
-        # 验证图片
-        is_valid, dimensions, format = self.validate_image(image_path)
+    def _store_artwork_image(self, image_path):
+        """验证并存储作品图片，返回存储信息（写库失败时用于清理）
+        
+        image_path 可以是路径、字节串或文件对象（如 Streamlit 上传文件）；
+        JPEG/PNG 按原始字节保存，不重新编码。
+        """
+        source = self._as_source(image_path)
+        is_valid, dimensions, format = self.validate_image(source)
         if not is_valid:
             raise ValueError(f"Invalid image: {dimensions}")
         
-        # 生成新的文件名和路径
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        new_filename = f"artwork_{timestamp}.{format.lower()}"
-        new_image_path = os.path.join(self.processed_images_dir, new_filename)
+        if format not in self.STORED_FORMATS:
+            source, format = self._reencode_png(source), 'PNG'
         
-        conn = self.connect_db()
-        cursor = conn.cursor()
+        # 按内容哈希存储图片（重复上传不再复制）
+        new_image_path, image_hash, created = self.store_image(source, self.STORED_FORMATS[format])
+        stored = {
+            'image_path': new_image_path,
+            'image_hash': image_hash,
+            'thumbnail_path': None,
+            'array_path': None,
+            'dimensions': dimensions,
+            'created': created
+        }
         
         try:
-            # 确保目标目录存在
-            os.makedirs(os.path.dirname(new_image_path), exist_ok=True)
+            thumbnail_path = self.thumbnail_path_for(new_image_path)
+            canonical_path = array_path(image_hash, self.arrays_dir)
+            need_thumbnail = created or not os.path.exists(thumbnail_path)
+            if need_thumbnail or not os.path.exists(canonical_path):
+                # 只解码一次：分析用标准数组和缩略图都由同一张快速解码的图片生成
+                with timed('importer.canonical_array'):
+                    array = decode_canonical(self._as_source(source))
+                    canonical_path, _ = write_canonical_array(array, image_hash, self.arrays_dir)
+                if need_thumbnail:
+                    thumbnail_path = self.create_thumbnail(new_image_path, array)
             
-            # 复制图片到processed目录
-            shutil.copy2(image_path, new_image_path)
+            # 相同内容共用一张缩略图和一个标准数组，之后分析时内存映射加载
+            stored['thumbnail_path'] = thumbnail_path
+            stored['array_path'] = canonical_path
+        except Exception:
+            self._discard_stored(stored)
+            raise
+        return stored
+    
+    @staticmethod
+    def _release_stored(stored):
+        """写库成功后取消图片的待写库标记"""
+        with _pending_lock:
+            _pending_hashes[stored['image_hash']] -= 1
+            if _pending_hashes[stored['image_hash']] <= 0:
+                del _pending_hashes[stored['image_hash']]
+    
+    def _discard_stored(self, stored):
+        """写库失败时清理存储的文件
+        
+        相同内容可能被其他作品引用或正由其他导入使用，只有在本进程没有
+        其他待写库的导入、且数据库中没有作品引用该内容时才删除。引用检查
+        在写线程中执行，不会与其他写库事务交错。
+        """
+        image_hash = stored['image_hash']
+        with _pending_lock:
+            _pending_hashes[image_hash] -= 1
+            if _pending_hashes[image_hash] > 0:
+                return
+            del _pending_hashes[image_hash]
             
-            # 插入作品数据
-            cursor.execute('''
-                INSERT INTO artworks (
-                    child_id, creation_date, image_path, dimensions,
-                    medium, artwork_theme, creation_setting, emotional_state
-                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-            ''', (
-                artwork_data['child_id'],
-                artwork_data['creation_date'],
-                new_image_path,
-                dimensions,
-                artwork_data['medium'],
-                artwork_data['artwork_theme'],
-                artwork_data['creation_setting'],
-                artwork_data['emotional_state']
-            ))
-            
-            artwork_id = cursor.lastrowid
-            conn.commit()
-            return artwork_id
+            def remove_unreferenced(conn):
+                referenced = conn.execute(
+                    'SELECT 1 FROM artworks WHERE image_hash = ? OR image_path = ? LIMIT 1',
+                    (image_hash, stored['image_path'])
+                ).fetchone()
+                if referenced is None:
+                    for path in [stored['image_path'], stored['thumbnail_path'], stored['array_path']]:
+                        if path and os.path.exists(path):
+                            os.remove(path)
             
+            self.db.write(remove_unreferenced)
+    
+    def import_artwork(self, artwork_data, image_path):
+        """导入艺术作品（image_path 可以是路径、字节串或文件对象）"""
+        stored = self._store_artwork_image(image_path)
+        try:
+            with timed('importer.db_write'):
+                artwork_id = self.db.write(lambda conn: self._insert_artwork(conn, artwork_data, stored))
         except Exception as e:
-            conn.rollback()
-            if os.path.exists(new_image_path):
-                os.remove(new_image_path)
+            self._discard_stored(stored)
             raise e
-        finally:
-            conn.close()
+        self._release_stored(stored)
+        return artwork_id
+    
+    def backfill_image_hashes(self):
+        """为旧作品记录补充图片内容哈希，返回 (更新数, 失败列表)"""
+        _, rows = self.db.query(
+            'SELECT artwork_id, image_path FROM artworks WHERE image_hash IS NULL'
+        )
+        
+        updates = []
+        errors = []
+        for artwork_id, image_path in rows:
+            try:
+                sha256 = hashlib.sha256()
+                with open(image_path, 'rb') as f:
+                    for chunk in iter(lambda: f.read(1 << 20), b''):
+                        sha256.update(chunk)
+                updates.append((sha256.hexdigest(), artwork_id))
+            except OSError as e:
+                errors.append((artwork_id, str(e)))
+        
+        self.db.write(lambda conn: conn.executemany(
+            'UPDATE artworks SET image_hash = ? WHERE artwork_id = ?', updates
+        ))
+        return len(updates), errors
 
+    @timed('importer.import_record')
     def import_complete_record(self, child_data, artwork_data, image_path):
-        """导入完整记录（包括儿童信息和作品）"""
+        """导入完整记录（包括儿童信息和作品，图片可以是路径、字节串或文件对象）"""
         try:
-            # 导入儿童信息
-            child_id = self.import_child_data(child_data)
+            stored = self._store_artwork_image(image_path)
             
-            # 添加child_id到artwork数据
-            artwork_data['child_id'] = child_id
+            def insert(conn):
+                # 儿童信息和作品在同一事务中写入
+                child_id = self._insert_child(conn, child_data)
+                
+                # 添加child_id到artwork数据
+                artwork_data['child_id'] = child_id
+                
+                return child_id, self._insert_artwork(conn, artwork_data, stored)
             
-            # 导入作品信息
-            artwork_id = self.import_artwork(artwork_data, image_path)
+            try:
+                with timed('importer.db_write'):
+                    child_id, artwork_id = self.db.write(insert)
+            except Exception:
+                self._discard_stored(stored)
+                raise
+            self._release_stored(stored)
             
             return {
                 'success': True,
@@ -127,41 +401,309 @@ class ArtworkImporter:
                 'success': False,
                 'error': str(e),
                 'message': '数据导入失败'
-            } 
+            }
+    
+    def _prepare_batch_row(self, row, image_dir):
+        """批量导入：校验清单行并存储图片（在线程池中执行）"""
+        missing = [field for field in ['image'] + CHILD_FIELDS + ARTWORK_FIELDS
+                   if field not in row]
+        if missing:
+            raise ValueError(f"Missing fields: {', '.join(missing)}")
+        
+        child = {field: row[field] for field in CHILD_FIELDS}
+        child['age'] = int(child['age'])
+        
+        stored = self._store_artwork_image(os.path.join(image_dir, row['image']))
+        stored['child'] = child
+        stored['artwork'] = {field: row[field] for field in ARTWORK_FIELDS}
+        return stored
+    
+    def _insert_batch(self, prepared):
+        """在写线程的一个事务中用 executemany 插入一批儿童和作品记录
+        
+        在写锁内预先分配ID，避免逐行读取 lastrowid。
+        """
+        def insert(conn):
+            cursor = conn.cursor()
+            
+            def next_id(table, column):
+                cursor.execute(f'SELECT COALESCE(MAX({column}), 0) FROM {table}')
+                max_id = cursor.fetchone()[0]
+                cursor.execute('SELECT seq FROM sqlite_sequence WHERE name = ?', (table,))
+                seq = cursor.fetchone()
+                return max(max_id, seq[0] if seq else 0) + 1
+            
+            first_child_id = next_id('children', 'child_id')
+            first_artwork_id = next_id('artworks', 'artwork_id')
+            
+            cursor.executemany('''
+                INSERT INTO children (child_id, age, gender, location, education_setting)
+                VALUES (?, ?, ?, ?, ?)
+            ''', [
+                (first_child_id + i, item['child']['age'], item['child']['gender'],
+                 item['child']['location'], item['child']['education_setting'])
+                for i, item in enumerate(prepared)
+            ])
+            
+            cursor.executemany('''
+                INSERT INTO artworks (
+                    artwork_id, child_id, creation_date, image_path, image_hash, thumbnail_path,
+                    dimensions, medium, artwork_theme, creation_setting, emotional_state
+                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ''', [
+                (first_artwork_id + i, first_child_id + i, item['artwork']['creation_date'],
+                 item['image_path'], item['image_hash'], item['thumbnail_path'],
+                 item['dimensions'], item['artwork']['medium'], item['artwork']['artwork_theme'],
+                 item['artwork']['creation_setting'], item['artwork']['emotional_state'])
+                for i, item in enumerate(prepared)
+            ])
+            
+            update_artwork_aggregates(
+                cursor, [first_artwork_id + i for i in range(len(prepared))]
+            )
+            return [
+                (first_child_id + i, first_artwork_id + i) for i in range(len(prepared))
+            ]
+        
+        return self.db.write(insert)
+    
+    def import_batch(self, manifest, image_dir, workers=8, chunk_size=200):
+        """批量导入作品
+        
+        manifest 为清单文件路径（CSV/JSONL）或字典列表，每行包含 image（相对
+        image_dir 的文件名）以及儿童和作品字段。图片在线程池中校验和存储，
+        记录按 chunk_size 分块、每块一个事务插入，整块失败时逐行重试。
+        返回每行的导入结果和统计。
+        """
+        rows = read_manifest(manifest) if isinstance(manifest, str) else list(manifest)
+        start = time.perf_counter()
+        report = [None] * len(rows)
+        
+        def prepare(index):
+            try:
+                return index, self._prepare_batch_row(rows[index], image_dir), None
+            except Exception as e:
+                return index, None, str(e)
+        
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            prepared = []
+            for index, item, error in executor.map(prepare, range(len(rows))):
+                if error is not None:
+                    report[index] = {'row': index + 1, 'success': False, 'error': error}
+                else:
+                    prepared.append((index, item))
+        
+        for offset in range(0, len(prepared), chunk_size):
+            chunk = prepared[offset:offset + chunk_size]
+            try:
+                results = [(chunk, self._insert_batch([item for _, item in chunk]), None)]
+            except Exception:
+                # 整块失败：逐行重新插入，只有出错的行报告失败
+                results = []
+                for entry in chunk:
+                    try:
+                        results.append(([entry], self._insert_batch([entry[1]]), None))
+                    except Exception as e:
+                        results.append(([entry], None, str(e)))
+            
+            for entries, ids, error in results:
+                if error is not None:
+                    # 清理失败行的文件（仍被其他行或作品引用的内容保留）
+                    for index, item in entries:
+                        self._discard_stored(item)
+                        report[index] = {'row': index + 1, 'success': False, 'error': error}
+                    continue
+                
+                for (index, item), (child_id, artwork_id) in zip(entries, ids):
+                    self._release_stored(item)
+                    report[index] = {
+                        'row': index + 1,
+                        'success': True,
+                        'child_id': child_id,
+                        'artwork_id': artwork_id
+                    }
+        
+        elapsed = time.perf_counter() - start
+        imported = sum(1 for item in report if item['success'])
+        return {
+            'total': len(rows),
+            'imported': imported,
+            'failed': len(rows) - imported,
+            'elapsed': elapsed,
+            'records_per_second': imported / elapsed if elapsed else 0.0,
+            'rows': report
+        }
 
-    def get_all_artworks(self, filters=None):
-        """获取所有作品数据"""
-        conn = self.connect_db()
-        cursor = conn.cursor()
+    # 作品列表查询的公共部分
+    ARTWORK_QUERY = '''
+        SELECT 
+            a.artwork_id,
+            a.image_path,
+            a.image_hash,
+            a.thumbnail_path,
+            a.creation_date,
+            a.medium,
+            a.artwork_theme,
+            a.emotional_state,
+            c.age,
+            c.gender,
+            c.location,
+            c.education_setting
+        FROM artworks a
+        JOIN children c ON a.child_id = c.child_id
+    '''
+    
+    @staticmethod
+    def build_filter_clause(filters):
+        """将筛选条件转换为参数化的WHERE子句
+        
+        支持的条件：age_range (最小, 最大)、gender / medium / education_setting
+        （列表）、location（模糊匹配）、date_range (开始, 结束)、
+        color (色彩桶, 最低覆盖比例)。
+        """
+        conditions = []
+        params = []
+        if not filters:
+            return conditions, params
+        
+        age_range = filters.get('age_range')
+        if age_range:
+            conditions.append('c.age BETWEEN ? AND ?')
+            params.extend(age_range)
+        
+        for key, column in [
+            ('gender', 'c.gender'),
+            ('medium', 'a.medium'),
+            ('education_setting', 'c.education_setting')
+        ]:
+            values = filters.get(key)
+            if values:
+                placeholders = ', '.join('?' for _ in values)
+                conditions.append(f'{column} IN ({placeholders})')
+                params.extend(values)
+        
+        location = filters.get('location')
+        if location:
+            conditions.append('c.location LIKE ?')
+            params.append(f'%{location}%')
         
+        date_range = filters.get('date_range')
+        if date_range:
+            start_date, end_date = date_range
+            conditions.append('a.creation_date BETWEEN ? AND ?')
+            params.extend([str(start_date), str(end_date)])
+        
+        color = filters.get('color')
+        if color:
+            # 通过色彩桶倒排索引查找，使用 (bucket, coverage) 索引
+            bucket, min_coverage = color
+            conditions.append(
+                'a.artwork_id IN (SELECT artwork_id FROM color_index WHERE bucket = ? AND coverage >= ?)'
+            )
+            params.extend([bucket, min_coverage])
+        
+        return conditions, params
+    
+    @timed('importer.query')
+    def _query_artworks(self, conditions, params, suffix=''):
         try:
-            query = '''
-                SELECT 
-                    a.artwork_id,
-                    a.image_path,
-                    a.creation_date,
-                    a.medium,
-                    a.artwork_theme,
-                    a.emotional_state,
-                    c.age,
-                    c.gender,
-                    c.location,
-                    c.education_setting
-                FROM artworks a
-                JOIN children c ON a.child_id = c.child_id
-            '''
-            
-            if filters:
-                # TODO: 添加过滤条件
-                pass
-            
-            cursor.execute(query)
-            columns = [desc[0] for desc in cursor.description]
-            results = [dict(zip(columns, row)) for row in cursor.fetchall()]
-            return results
+            query = self.ARTWORK_QUERY
+            if conditions:
+                query += ' WHERE ' + ' AND '.join(conditions)
+            query += suffix
+            
+            columns, rows = self.db.query(query, params)
+            return [dict(zip(columns, row)) for row in rows]
         
         except Exception as e:
             print(f"Error fetching artworks: {e}")
             return []
-        finally:
-            conn.close()
\ No newline at end of file
+    
+    def get_all_artworks(self, filters=None):
+        """获取所有作品数据"""
+        conditions, params = self.build_filter_clause(filters)
+        return self._query_artworks(conditions, params, ' ORDER BY a.artwork_id')
+    
+    def get_artworks_page(self, filters=None, page_size=12, after_id=None):
+        """按作品ID分页获取作品数据（键集分页）
+        
+        返回 (作品列表, 下一页游标)；没有更多数据时游标为 None。
+        """
+        conditions, params = self.build_filter_clause(filters)
+        if after_id is not None:
+            conditions.append('a.artwork_id > ?')
+            params.append(after_id)
+        
+        # 多取一条用于判断是否还有下一页
+        rows = self._query_artworks(
+            conditions, params + [page_size + 1],
+            ' ORDER BY a.artwork_id LIMIT ?'
+        )
+        if len(rows) > page_size:
+            rows = rows[:page_size]
+            return rows, rows[-1]['artwork_id']
+        return rows, None
+    
+    def get_artworks_by_ids(self, artwork_ids):
+        """按作品ID读取作品数据，按传入顺序返回（不存在的ID被跳过）"""
+        if not artwork_ids:
+            return []
+        placeholders = ', '.join('?' * len(artwork_ids))
+        rows = self._query_artworks([f'a.artwork_id IN ({placeholders})'], list(artwork_ids))
+        by_id = {row['artwork_id']: row for row in rows}
+        return [by_id[artwork_id] for artwork_id in artwork_ids if artwork_id in by_id]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="作品数据维护")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    
+    backfill = subparsers.add_parser('backfill-thumbnails', help="为已有作品补生成缩略图")
+    backfill.add_argument('--db', default='artwork_database.db', help="数据库路径")
+    
+    hashes = subparsers.add_parser('backfill-hashes', help="为已有作品补充图片内容哈希")
+    hashes.add_argument('--db', default='artwork_database.db', help="数据库路径")
+    
+    batch = subparsers.add_parser('import-batch', help="按清单批量导入作品")
+    batch.add_argument('manifest', help="清单文件（CSV或JSONL）")
+    batch.add_argument('image_dir', help="图片目录")
+    batch.add_argument('--db', default='artwork_database.db', help="数据库路径")
+    batch.add_argument('--workers', type=int, default=8, help="校验和复制图片的线程数")
+    batch.add_argument('--chunk-size', type=int, default=200, help="每个事务插入的记录数")
+    batch.add_argument('--report', help="将逐行结果写入JSONL文件")
+    
+    args = parser.parse_args()
+    
+    if args.command == 'import-batch':
+        importer = ArtworkImporter(args.db)
+        result = importer.import_batch(
+            args.manifest, args.image_dir,
+            workers=args.workers, chunk_size=args.chunk_size
+        )
+        print(f"导入 {result['imported']}/{result['total']} 条，失败 {result['failed']} 条，"
+              f"用时 {result['elapsed']:.2f} 秒 ({result['records_per_second']:.1f} 条/秒)")
+        for row in result['rows']:
+            if not row['success']:
+                print(f"  第 {row['row']} 行: {row['error']}")
+        if args.report:
+            with open(args.report, 'w', encoding='utf-8') as f:
+                for row in result['rows']:
+                    f.write(json.dumps(row, ensure_ascii=False) + '\n')
+    
+    elif args.command == 'backfill-thumbnails':
+        importer = ArtworkImporter(args.db)
+        created, errors = importer.backfill_thumbnails()
+        print(f"生成缩略图 {created} 张，失败 {len(errors)} 张")
+        for artwork_id, error in errors:
+            print(f"  作品 #{artwork_id}: {error}")
+    
+    elif args.command == 'backfill-hashes':
+        importer = ArtworkImporter(args.db)
+        updated, errors = importer.backfill_image_hashes()
+        print(f"补充哈希 {updated} 条，失败 {len(errors)} 条")
+        for artwork_id, error in errors:
+            print(f"  作品 #{artwork_id}: {error}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,9 @@
 import sqlite3
 import os
 
-def create_database():
+def create_database(db_path='artwork_database.db'):
     # 连接到数据库（如果不存在则创建）
-    conn = sqlite3.connect('artwork_database.db')
+    conn = sqlite3.connect(db_path)
     cursor = conn.cursor()
     
     # 创建儿童信息表
@@ -25,6 +25,8 @@ def create_database():
         child_id INTEGER,
         creation_date DATE,
         image_path TEXT NOT NULL,
+        image_hash TEXT,  -- 图片内容SHA-256（内容寻址存储的键）
+        thumbnail_path TEXT,
         dimensions TEXT,
         medium TEXT,
         artwork_theme TEXT,
@@ -40,9 +42,12 @@ def create_database():
     CREATE TABLE IF NOT EXISTS color_analysis (
         analysis_id INTEGER PRIMARY KEY AUTOINCREMENT,
         artwork_id INTEGER,
-        dominant_colors TEXT,  # JSON格式存储色彩数据
-        color_distribution TEXT,  # JSON格式存储分布数据
-        color_combinations TEXT,  # JSON格式存储搭配数据
+        image_hash TEXT,  -- 图片内容SHA-256，用于判断分析结果是否过期
+        image_size INTEGER,  -- 分析时的文件大小
+        image_mtime REAL,  -- 分析时的文件修改时间
+        dominant_colors TEXT,  -- JSON格式存储色彩数据
+        color_distribution TEXT,  -- JSON格式存储分布数据
+        color_combinations TEXT,  -- JSON格式存储搭配数据
         analysis_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
         FOREIGN KEY (artwork_id) REFERENCES artworks (artwork_id)
     )
@@ -53,22 +58,155 @@ def create_database():
     CREATE TABLE IF NOT EXISTS psychological_mappings (
         mapping_id INTEGER PRIMARY KEY AUTOINCREMENT,
         artwork_id INTEGER,
-        emotional_indicators TEXT,  # JSON格式存储情绪指标
-        personality_traits TEXT,    # JSON格式存储性格特征
+        image_hash TEXT,
+        emotional_indicators TEXT,  -- JSON格式存储情绪指标
+        personality_traits TEXT,    -- JSON格式存储性格特征
         analysis_notes TEXT,
         created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
         FOREIGN KEY (artwork_id) REFERENCES artworks (artwork_id)
     )
     ''')
     
+    # 相似作品检索使用的色彩向量（float32二进制）
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS color_embeddings (
+        embedding_id INTEGER PRIMARY KEY AUTOINCREMENT,
+        artwork_id INTEGER UNIQUE,
+        image_hash TEXT,
+        palette BLOB,    -- 主要色彩，每行 (R, G, B, 比例)
+        histogram BLOB,  -- HSV直方图嵌入
+        FOREIGN KEY (artwork_id) REFERENCES artworks (artwork_id)
+    )
+    ''')
+    
+    # 色彩桶倒排索引（色彩桶 -> 作品及覆盖比例）
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS color_index (
+        bucket TEXT NOT NULL,  -- 基础色彩（如 red）或 基础色彩-明度-饱和度（如 red-light-vivid）
+        artwork_id INTEGER NOT NULL,
+        coverage REAL NOT NULL,  -- 该色彩桶占画面的比例
+        PRIMARY KEY (bucket, artwork_id),
+        FOREIGN KEY (artwork_id) REFERENCES artworks (artwork_id)
+    )
+    ''')
+    
+    # 关联规则挖掘的运行记录和规则（只保留最近一次运行的规则）
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS association_runs (
+        run_id INTEGER PRIMARY KEY AUTOINCREMENT,
+        n_transactions INTEGER,
+        n_items INTEGER,
+        params TEXT,  -- JSON格式存储挖掘参数
+        elapsed REAL,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+    ''')
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS association_rules (
+        rule_id INTEGER PRIMARY KEY AUTOINCREMENT,
+        run_id INTEGER,
+        antecedents TEXT,  -- JSON数组，如 ["color=red"]
+        consequents TEXT,
+        consequent_categories TEXT,  -- 结论的项目类别，如 emotion
+        support REAL,
+        confidence REAL,
+        lift REAL,
+        FOREIGN KEY (run_id) REFERENCES association_runs (run_id)
+    )
+    ''')
+    
+    # 统计报告的汇总计数（导入和分析时增量维护）
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS report_aggregates (
+        dimension TEXT NOT NULL,  -- 统计维度，如 gender、age、base_color
+        key TEXT NOT NULL,
+        count INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (dimension, key)
+    )
+    ''')
+    
+    # 后台分析任务队列（应用重启后未完成的任务重新排队）
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS analysis_jobs (
+        job_id INTEGER PRIMARY KEY AUTOINCREMENT,
+        artwork_id INTEGER NOT NULL,
+        status TEXT NOT NULL DEFAULT 'queued',  -- queued / running / done / failed
+        error TEXT,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        started_at TIMESTAMP,
+        finished_at TIMESTAMP,
+        FOREIGN KEY (artwork_id) REFERENCES artworks (artwork_id)
+    )
+    ''')
+    
+    # 为旧数据库补充新增的列
+    ensure_column(cursor, 'artworks', 'thumbnail_path', 'TEXT')
+    ensure_column(cursor, 'artworks', 'image_hash', 'TEXT')
+    
+    # 作品浏览筛选使用的索引
+    cursor.execute('''
+    CREATE INDEX IF NOT EXISTS idx_artworks_child_date_medium
+    ON artworks (child_id, creation_date, medium)
+    ''')
+    cursor.execute('''
+    CREATE INDEX IF NOT EXISTS idx_children_age_gender_education
+    ON children (age, gender, education_setting)
+    ''')
+    
+    cursor.execute('''
+    CREATE INDEX IF NOT EXISTS idx_artworks_image_hash
+    ON artworks (image_hash)
+    ''')
+    
+    # 分析结果按作品和图片哈希查询
+    cursor.execute('''
+    CREATE INDEX IF NOT EXISTS idx_color_analysis_artwork
+    ON color_analysis (artwork_id, image_hash)
+    ''')
+    cursor.execute('''
+    CREATE INDEX IF NOT EXISTS idx_color_analysis_hash
+    ON color_analysis (image_hash)
+    ''')
+    cursor.execute('''
+    CREATE INDEX IF NOT EXISTS idx_psychological_mappings_artwork
+    ON psychological_mappings (artwork_id, image_hash)
+    ''')
+    
+    # 按色彩桶和覆盖比例查询作品
+    cursor.execute('''
+    CREATE INDEX IF NOT EXISTS idx_color_index_bucket_coverage
+    ON color_index (bucket, coverage, artwork_id)
+    ''')
+    cursor.execute('''
+    CREATE INDEX IF NOT EXISTS idx_color_index_artwork
+    ON color_index (artwork_id)
+    ''')
+    
+    # 每件作品最多一个未完成的分析任务（重复提交合并为同一任务）
+    cursor.execute('''
+    CREATE UNIQUE INDEX IF NOT EXISTS idx_analysis_jobs_active
+    ON analysis_jobs (artwork_id) WHERE status IN ('queued', 'running')
+    ''')
+    cursor.execute('''
+    CREATE INDEX IF NOT EXISTS idx_analysis_jobs_status
+    ON analysis_jobs (status)
+    ''')
+    
     conn.commit()
     conn.close()
 
+def ensure_column(cursor, table, column, definition):
+    """列不存在时添加（用于升级已有数据库）"""
+    cursor.execute(f'PRAGMA table_info({table})')
+    if column not in [row[1] for row in cursor.fetchall()]:
+        cursor.execute(f'ALTER TABLE {table} ADD COLUMN {column} {definition}')
+
 def create_directory_structure():
     # 创建必要的目录结构
     directories = [
         'data/raw_images',
         'data/processed_images',
+        'data/thumbnails',
         'data/color_analysis'
     ]
     
@@ -0,0 +1,154 @@
+import os
+import queue
+import sqlite3
+import threading
+from concurrent.futures import Future
+from metrics import timed
+
+# 连接调优参数
+PRAGMAS = {
+    'journal_mode': 'WAL',        # 读写互不阻塞
+    'synchronous': 'NORMAL',      # WAL模式下保证一致性，且不必每次提交都fsync
+    'cache_size': -32000,         # 页缓存约32MB（负数表示KB）
+    'mmap_size': 268435456,       # 256MB内存映射读取
+    'temp_store': 'MEMORY',
+    'busy_timeout': 5000          # 其他进程持有写锁时最多等待5秒
+}
+
+
+def tune_connection(conn):
+    """为连接设置调优参数"""
+    for name, value in PRAGMAS.items():
+        conn.execute(f'PRAGMA {name} = {value}')
+    return conn
+
+
+class Database:
+    """共享的SQLite连接层
+
+    读操作使用每个线程独立的持久连接；写操作提交到唯一的写线程，
+    写线程把排队中的多个写任务合并到一个事务中提交，避免多个会话
+    同时写入时出现 "database is locked"。每个写任务在单独的保存点中
+    执行，一个任务失败不影响同批次的其他任务。
+    """
+
+    def __init__(self, db_path, max_batch=64, batch_wait=0.002):
+        self.db_path = db_path
+        self.max_batch = max_batch
+        self.batch_wait = batch_wait
+        self._local = threading.local()
+        self._queue = queue.Queue()
+        self._writer = threading.Thread(
+            target=self._writer_loop, name=f"sqlite-writer:{db_path}", daemon=True
+        )
+        self._writer.start()
+
+    def read_connection(self):
+        """当前线程的只读连接（不要关闭）"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = tune_connection(sqlite3.connect(self.db_path))
+            self._local.conn = conn
+        return conn
+
+    @timed('sqlite.query')
+    def query(self, sql, params=()):
+        """执行查询，返回 (列名列表, 行列表)"""
+        cursor = self.read_connection().execute(sql, params)
+        columns = [desc[0] for desc in cursor.description]
+        return columns, cursor.fetchall()
+
+    def submit_write(self, func):
+        """提交写任务 func(conn)，返回 Future（结果为 func 的返回值）
+
+        func 在写线程的事务内执行，不能自行 commit/rollback。
+        """
+        future = Future()
+        self._queue.put((func, future))
+        return future
+
+    @timed('sqlite.write')
+    def write(self, func):
+        """提交写任务并等待其提交完成（计时包含排队时间）"""
+        return self.submit_write(func).result()
+
+    def execute_write(self, sql, params=()):
+        """执行单条写语句，返回 lastrowid"""
+        return self.write(lambda conn: conn.execute(sql, params).lastrowid)
+
+    def _writer_loop(self):
+        conn = tune_connection(sqlite3.connect(self.db_path, isolation_level=None))
+
+        while True:
+            batch = [self._queue.get()]
+
+            # 稍等片刻，把同时到达的写任务合并到一个事务
+            while len(batch) < self.max_batch:
+                try:
+                    batch.append(self._queue.get(timeout=self.batch_wait))
+                except queue.Empty:
+                    break
+
+            self._run_batch(conn, batch)
+
+    def _run_batch(self, conn, batch):
+        if not batch:
+            return
+        results = []
+        try:
+            conn.execute('BEGIN IMMEDIATE')
+        except Exception as e:
+            for _, future in batch:
+                future.set_exception(e)
+            return
+
+        for index, (func, future) in enumerate(batch):
+            try:
+                conn.execute('SAVEPOINT write_task')
+                result = func(conn)
+                conn.execute('RELEASE write_task')
+                results.append((future, result, None))
+            except Exception as e:
+                results.append((future, None, e))
+                try:
+                    conn.execute('ROLLBACK TO write_task')
+                    conn.execute('RELEASE write_task')
+                except sqlite3.Error:
+                    pass
+
+                if not conn.in_transaction:
+                    # SQLite 在磁盘已满、IO错误等情况下会自动回滚整个事务：本批已执行
+                    # 的写入都没有保存，全部报错；其余任务在新事务中执行，不会在
+                    # 自动提交模式下被单独提交
+                    for done, _, error in results:
+                        done.set_exception(error or e)
+                    self._run_batch(conn, batch[index + 1:])
+                    return
+
+        try:
+            conn.execute('COMMIT')
+        except Exception as e:
+            if conn.in_transaction:
+                conn.execute('ROLLBACK')
+            for future, _, _ in results:
+                future.set_exception(e)
+            return
+
+        for future, result, error in results:
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(result)
+
+
+_databases = {}
+_databases_lock = threading.Lock()
+
+
+def get_database(db_path):
+    """按数据库文件返回进程内共享的 Database 实例"""
+    key = os.path.abspath(db_path)
+    with _databases_lock:
+        if key not in _databases:
+            _databases[key] = Database(db_path)
+        return _databases[key]
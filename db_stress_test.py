@@ -0,0 +1,126 @@
+import os
+import io
+import time
+import random
+import sqlite3
+import argparse
+import tempfile
+import threading
+from PIL import Image
+from data_importer import ArtworkImporter
+
+
+def make_image(seed, size=64):
+    """生成一张随机色块的小图片（PNG字节）"""
+    rng = random.Random(seed)
+    image = Image.new('RGB', (size, size), tuple(rng.randrange(256) for _ in range(3)))
+    for _ in range(4):
+        x, y = rng.randrange(size), rng.randrange(size)
+        color = tuple(rng.randrange(256) for _ in range(3))
+        image.paste(color, (x, y, min(size, x + 16), min(size, y + 16)))
+    buffer = io.BytesIO()
+    image.save(buffer, format='PNG')
+    return buffer.getvalue()
+
+
+def run_stress(uploaders=16, uploads_per_thread=20, workdir=None):
+    """模拟多个会话同时上传作品，统计吞吐量和锁错误
+
+    每个上传线程使用各自的 ArtworkImporter（与多个 Streamlit 会话相同），
+    同时穿插读取作品列表。返回统计结果。
+    """
+    workdir = workdir or tempfile.mkdtemp(prefix='artwork_stress_')
+    db_path = os.path.join(workdir, 'stress.db')
+    image_dir = os.path.join(workdir, 'uploads')
+    os.makedirs(image_dir, exist_ok=True)
+
+    # 预先生成图片，计时只包含导入
+    paths = []
+    for thread_index in range(uploaders):
+        thread_paths = []
+        for i in range(uploads_per_thread):
+            path = os.path.join(image_dir, f"{thread_index}_{i}.png")
+            with open(path, 'wb') as f:
+                f.write(make_image(thread_index * 100000 + i))
+            thread_paths.append(path)
+        paths.append(thread_paths)
+
+    cwd = os.getcwd()
+    os.chdir(workdir)
+    lock = threading.Lock()
+    stats = {'imported': 0, 'failed': 0, 'locked': 0, 'reads': 0, 'errors': []}
+
+    def uploader(thread_index):
+        importer = ArtworkImporter(db_path)
+        for i, path in enumerate(paths[thread_index]):
+            result = importer.import_complete_record(
+                {
+                    'age': 3 + (i % 10),
+                    'gender': '男' if i % 2 else '女',
+                    'location': f"城市{thread_index}",
+                    'education_setting': '幼儿园'
+                },
+                {
+                    'creation_date': '2024-01-01',
+                    'medium': '蜡笔',
+                    'artwork_theme': '压力测试',
+                    'creation_setting': '课堂',
+                    'emotional_state': '平静'
+                },
+                path
+            )
+            importer.get_artworks_page(page_size=12)
+            with lock:
+                stats['reads'] += 1
+                if result['success']:
+                    stats['imported'] += 1
+                else:
+                    stats['failed'] += 1
+                    if 'locked' in result['error']:
+                        stats['locked'] += 1
+                    stats['errors'].append(result['error'])
+
+    try:
+        start = time.perf_counter()
+        threads = [threading.Thread(target=uploader, args=(i,)) for i in range(uploaders)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - start
+    finally:
+        os.chdir(cwd)
+
+    conn = sqlite3.connect(db_path)
+    try:
+        rows = conn.execute('SELECT COUNT(*) FROM artworks').fetchone()[0]
+    finally:
+        conn.close()
+
+    stats.update({
+        'workdir': workdir,
+        'elapsed': elapsed,
+        'rows': rows,
+        'uploads_per_second': stats['imported'] / elapsed if elapsed else 0.0
+    })
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="SQLite并发上传压力测试")
+    parser.add_argument('--uploaders', type=int, default=16, help="并发上传线程数")
+    parser.add_argument('--uploads', type=int, default=20, help="每个线程上传的作品数")
+    parser.add_argument('--workdir', default=None, help="测试目录（默认新建临时目录）")
+    args = parser.parse_args()
+
+    stats = run_stress(args.uploaders, args.uploads, args.workdir)
+    print(f"导入 {stats['imported']} 条, 失败 {stats['failed']} 条 "
+          f"(锁错误 {stats['locked']} 条), 数据库共 {stats['rows']} 条, "
+          f"用时 {stats['elapsed']:.2f} 秒 ({stats['uploads_per_second']:.1f} 条/秒)")
+    for error in stats['errors'][:10]:
+        print(f"  {error}")
+    print(f"测试目录: {stats['workdir']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+import time
+import threading
+from collections import deque
+from contextlib import ContextDecorator
+import numpy as np
+
+# 每个指标保留的最近样本数（用于计算分位数）
+SAMPLE_SIZE = 1024
+QUANTILES = (0.5, 0.9, 0.99)
+
+
+class StageStats:
+    """单个阶段的计数、总耗时和最近样本"""
+
+    def __init__(self, sample_size=SAMPLE_SIZE):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.samples = deque(maxlen=sample_size)
+
+    def add(self, seconds):
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+        self.samples.append(seconds)
+
+
+class MetricsRegistry:
+    """进程内的阶段耗时统计（线程安全）"""
+
+    def __init__(self, sample_size=SAMPLE_SIZE):
+        self.sample_size = sample_size
+        self._stages = {}
+        self._lock = threading.Lock()
+
+    def observe(self, name, seconds):
+        with self._lock:
+            stats = self._stages.get(name)
+            if stats is None:
+                stats = self._stages[name] = StageStats(self.sample_size)
+            stats.add(seconds)
+
+    def reset(self):
+        with self._lock:
+            self._stages.clear()
+
+    def snapshot(self):
+        """返回每个阶段的统计 [{name, count, total, mean, p50, p90, p99, max}, ...]（秒）"""
+        with self._lock:
+            stages = [
+                (name, stats.count, stats.total, stats.max, np.array(stats.samples))
+                for name, stats in self._stages.items()
+            ]
+
+        rows = []
+        for name, count, total, maximum, samples in sorted(stages):
+            row = {'name': name, 'count': count, 'total': total, 'mean': total / count, 'max': maximum}
+            for quantile, value in zip(QUANTILES, np.quantile(samples, QUANTILES)):
+                row[f"p{int(quantile * 100)}"] = float(value)
+            rows.append(row)
+        return rows
+
+    def prometheus_text(self, metric='artwork_stage_seconds'):
+        """Prometheus 文本格式（summary 类型，分位数基于最近样本）"""
+        lines = [
+            f"# HELP {metric} Time spent in instrumented stages.",
+            f"# TYPE {metric} summary"
+        ]
+        for row in self.snapshot():
+            label = row['name'].replace('\\', '\\\\').replace('"', '\\"')
+            for quantile in QUANTILES:
+                value = row[f"p{int(quantile * 100)}"]
+                lines.append(f'{metric}{{stage="{label}",quantile="{quantile}"}} {value:.9f}')
+            lines.append(f'{metric}_sum{{stage="{label}"}} {row["total"]:.9f}')
+            lines.append(f'{metric}_count{{stage="{label}"}} {row["count"]}')
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = MetricsRegistry()
+
+
+class timed(ContextDecorator):
+    """阶段计时：既可用作 with timed('阶段名')，也可用作 @timed('阶段名')"""
+
+    def __init__(self, name, registry=None):
+        self.name = name
+        self.registry = registry or REGISTRY
+        self._local = threading.local()
+
+    def __enter__(self):
+        # 同一实例作为装饰器时可能被多个线程或递归调用同时使用
+        starts = getattr(self._local, 'starts', None)
+        if starts is None:
+            starts = self._local.starts = []
+        starts.append(time.perf_counter())
+        return self
+
+    def __exit__(self, *exc):
+        self.registry.observe(self.name, time.perf_counter() - self._local.starts.pop())
+        return False
@@ -0,0 +1,126 @@
+import os
+import time
+import argparse
+import numpy as np
+from color_analyzer import ColorAnalyzer, ANALYSIS_MODES, DECODE_MODES, palette_drift
+from analysis_cache import AnalysisCache
+
+
+def evaluate_modes(image_paths, n_colors=5):
+    """对比各分析模式与精确模式的调色板偏差和耗时"""
+    # 不使用缓存，保证计时准确
+    analyzer = ColorAnalyzer(cache=AnalysisCache(max_bytes=0))
+    results = {mode: {'times': [], 'color_distance': [], 'percentage_error': []}
+               for mode in ANALYSIS_MODES}
+
+    for image_path in image_paths:
+        palettes = {}
+        for mode in ANALYSIS_MODES:
+            start = time.perf_counter()
+            palettes[mode] = analyzer.extract_dominant_colors(image_path, n_colors, mode)
+            results[mode]['times'].append(time.perf_counter() - start)
+
+        for mode in ANALYSIS_MODES:
+            drift = palette_drift(palettes['exact'], palettes[mode])
+            results[mode]['color_distance'].append(drift['color_distance'])
+            results[mode]['percentage_error'].append(drift['percentage_error'])
+
+    report = {}
+    for mode, values in results.items():
+        report[mode] = {
+            'mean_time': float(np.mean(values['times'])),
+            'mean_color_distance': float(np.mean(values['color_distance'])),
+            'max_color_distance': float(np.max(values['color_distance'])),
+            'mean_percentage_error': float(np.mean(values['percentage_error'])),
+            'max_percentage_error': float(np.max(values['percentage_error']))
+        }
+    return report
+
+
+def evaluate_decode(image_paths, n_colors=5):
+    """对比快速解码与全尺寸解码在精确模式下的调色板偏差和预处理耗时"""
+    analyzers = {
+        decode: ColorAnalyzer(cache=AnalysisCache(max_bytes=0), decode=decode)
+        for decode in DECODE_MODES
+    }
+    results = {decode: {'times': [], 'color_distance': [], 'percentage_error': []}
+               for decode in DECODE_MODES}
+
+    for image_path in image_paths:
+        palettes = {}
+        for decode, analyzer in analyzers.items():
+            start = time.perf_counter()
+            array = analyzer._preprocess_image(image_path)
+            results[decode]['times'].append(time.perf_counter() - start)
+            palettes[decode] = analyzer._dominant_colors(array, n_colors, 'exact')
+
+        for decode in DECODE_MODES:
+            drift = palette_drift(palettes['exact'], palettes[decode])
+            results[decode]['color_distance'].append(drift['color_distance'])
+            results[decode]['percentage_error'].append(drift['percentage_error'])
+
+    return {
+        decode: {
+            'mean_time': float(np.mean(values['times'])),
+            'max_color_distance': float(np.max(values['color_distance'])),
+            'max_percentage_error': float(np.max(values['percentage_error']))
+        }
+        for decode, values in results.items()
+    }
+
+
+def find_images(image_dir):
+    """递归查找目录下的图片（内容寻址存储按哈希前缀分为两级子目录）"""
+    image_paths = []
+    for root, dirs, files in os.walk(image_dir):
+        dirs.sort()
+        image_paths.extend(
+            os.path.join(root, name) for name in sorted(files)
+            if name.lower().endswith(('.jpg', '.jpeg', '.png'))
+        )
+    return image_paths
+
+
+def recommend_mode(report, max_color_distance=10.0, max_percentage_error=0.05):
+    """选出偏差在容差内且平均耗时最短的模式"""
+    candidates = [
+        mode for mode, stats in report.items()
+        if stats['max_color_distance'] <= max_color_distance
+        and stats['max_percentage_error'] <= max_percentage_error
+    ]
+    return min(candidates, key=lambda mode: report[mode]['mean_time'])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="检查各分析模式相对精确模式的调色板偏差")
+    parser.add_argument('images', nargs='*', help="图片路径（默认使用 --image-dir 下的全部图片）")
+    parser.add_argument('--image-dir', default='data/processed_images', help="默认查找图片的目录")
+    parser.add_argument('--n-colors', type=int, default=5)
+    parser.add_argument('--max-color-distance', type=float, default=10.0, help="允许的最大RGB距离")
+    parser.add_argument('--max-percentage-error', type=float, default=0.05, help="允许的最大比例偏差")
+    args = parser.parse_args()
+
+    image_paths = args.images
+    if not image_paths:
+        image_paths = find_images(args.image_dir)
+    if not image_paths:
+        parser.error("没有找到可用于检查的图片")
+
+    report = evaluate_modes(image_paths, n_colors=args.n_colors)
+
+    print(f"共检查 {len(image_paths)} 张图片（以 exact 模式为基准）")
+    print(f"{'模式':<10}{'平均耗时(秒)':>14}{'平均色差':>10}{'最大色差':>10}{'最大比例偏差':>14}")
+    for mode, stats in report.items():
+        print(f"{mode:<10}{stats['mean_time']:>14.3f}{stats['mean_color_distance']:>10.2f}"
+              f"{stats['max_color_distance']:>10.2f}{stats['max_percentage_error']:>14.3f}")
+
+    print(f"推荐模式: {recommend_mode(report, args.max_color_distance, args.max_percentage_error)}")
+
+    print(f"\n{'解码':<10}{'预处理耗时(秒)':>14}{'最大色差':>10}{'最大比例偏差':>14}")
+    for decode, stats in evaluate_decode(image_paths, n_colors=args.n_colors).items():
+        print(f"{decode:<10}{stats['mean_time']:>14.3f}{stats['max_color_distance']:>10.2f}"
+              f"{stats['max_percentage_error']:>14.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,11 +1,11 @@
-import numpy as np
-from sklearn.cluster import KMeans
-from sklearn.preprocessing import StandardScaler
-from mlxtend.frequent_patterns import apriori
-from mlxtend.frequent_patterns import association_rules
+from color_analyzer import ColorAnalyzer
+from metrics import timed
 
 class PsychologicalAnalyzer:
-    def __init__(self):
+    def __init__(self, pattern_model=None):
+        # 语料级色彩模式模型（color_pattern_model.ColorPatternModel），只做预测
+        self.pattern_model = pattern_model
+        
         # 心理特征映射字典
         self.personality_traits = {
             'artistic': {
@@ -54,21 +54,17 @@ class PsychologicalAnalyzer:
             ]
         }
     
+    @timed('psychological_analyzer.color_patterns')
     def analyze_color_patterns(self, artwork_data):
-        """分析色彩使用模式"""
-        # 提取色彩特征
-        colors = np.array([self._hex_to_rgb(color) for color, _ in artwork_data])
-        
-        # 标准化数据
-        scaler = StandardScaler()
-        colors_scaled = scaler.fit_transform(colors)
-        
-        # 聚类分析
-        kmeans = KMeans(n_clusters=3, random_state=42)
-        clusters = kmeans.fit_predict(colors_scaled)
+        """分析色彩使用模式：每个主要色彩所属的语料级色彩模式
         
-        return clusters
+        没有已拟合的模型时退化为按基础色彩分组（同样不需要拟合）。
+        """
+        if self.pattern_model is not None:
+            return self.pattern_model.predict(artwork_data)
+        return ColorAnalyzer.classify_base_colors([color for color, _ in artwork_data])
     
+    @timed('psychological_analyzer.traits')
     def extract_psychological_traits(self, color_patterns, artwork_metadata):
         """提取心理特征"""
         traits = {}
@@ -96,6 +92,7 @@ class PsychologicalAnalyzer:
         
         return traits
     
+    @timed('psychological_analyzer.recommendations')
     def generate_recommendations(self, psychological_traits):
         """生成教育建议"""
         recommendations = []
@@ -0,0 +1,158 @@
+import json
+import argparse
+from collections import Counter
+from color_analyzer import ColorAnalyzer, BASE_COLOR_NAMES
+from database_setup import create_database
+from db_connection import get_database
+
+# 缺失值统一归入“未知”
+UNKNOWN = '未知'
+
+# 作品维度：维度名 -> SQL表达式（artworks a JOIN children c）
+ARTWORK_DIMENSIONS = {
+    'total': "''",
+    'gender': 'c.gender',
+    'age': 'CAST(c.age AS TEXT)',
+    'education_setting': 'c.education_setting',
+    'medium': 'a.medium',
+    'month': 'substr(a.creation_date, 1, 7)'
+}
+
+ANALYSIS_QUERY = '''
+    SELECT ca.dominant_colors, pm.emotional_indicators, c.education_setting
+    FROM color_analysis ca
+    LEFT JOIN psychological_mappings pm
+        ON pm.artwork_id = ca.artwork_id AND pm.image_hash = ca.image_hash
+    LEFT JOIN artworks a ON a.artwork_id = ca.artwork_id
+    LEFT JOIN children c ON c.child_id = a.child_id
+'''
+
+
+def add_counts(cursor, counts, sign=1):
+    """把计数增量累加到 report_aggregates（sign=-1 时扣减）"""
+    cursor.executemany('''
+        INSERT INTO report_aggregates (dimension, key, count) VALUES (?, ?, ?)
+        ON CONFLICT (dimension, key) DO UPDATE SET count = count + excluded.count
+    ''', [(dimension, key, sign * count) for (dimension, key), count in counts.items() if count])
+    if sign < 0:
+        cursor.execute('DELETE FROM report_aggregates WHERE count <= 0')
+
+
+def artwork_counts(rows):
+    """按作品维度计数，rows 中每行按 ARTWORK_DIMENSIONS 的顺序排列"""
+    counts = Counter()
+    for row in rows:
+        for dimension, value in zip(ARTWORK_DIMENSIONS, row):
+            counts[(dimension, UNKNOWN if value is None else str(value))] += 1
+    return counts
+
+
+def analysis_counts(rows):
+    """按分析结果计数：基础色彩、情绪以及教育环境×基础色彩
+
+    rows 中每行为 (dominant_colors JSON, emotional_indicators JSON, education_setting)。
+    """
+    counts = Counter()
+    for dominant_colors, emotions, education_setting in rows:
+        counts[('analyzed', '')] += 1
+
+        colors = [color for color, _ in json.loads(dominant_colors or '[]')]
+        if colors:
+            for index in ColorAnalyzer.classify_base_colors(colors):
+                color = BASE_COLOR_NAMES[index]
+                counts[('base_color', color)] += 1
+                key = json.dumps([education_setting or UNKNOWN, color], ensure_ascii=False)
+                counts[('education_base_color', key)] += 1
+
+        for emotion, _ in json.loads(emotions or '[]'):
+            counts[('emotion', emotion)] += 1
+    return counts
+
+
+def update_artwork_aggregates(cursor, artwork_ids, sign=1):
+    """在写事务中累加（或扣减）指定作品的作品维度计数（cursor 可以是连接或游标）"""
+    if not artwork_ids:
+        return
+    placeholders = ', '.join('?' * len(artwork_ids))
+    rows = cursor.execute(f'''
+        SELECT {', '.join(ARTWORK_DIMENSIONS.values())}
+        FROM artworks a
+        LEFT JOIN children c ON c.child_id = a.child_id
+        WHERE a.artwork_id IN ({placeholders})
+    ''', list(artwork_ids)).fetchall()
+    add_counts(cursor, artwork_counts(rows), sign)
+
+
+def update_analysis_aggregates(cursor, artwork_id, sign=1):
+    """在写事务中累加（或扣减）作品当前分析结果的计数
+
+    写入新结果前以 sign=-1 调用扣除旧结果，写入后以 sign=1 调用。
+    """
+    rows = cursor.execute(ANALYSIS_QUERY + ' WHERE ca.artwork_id = ?', (artwork_id,)).fetchall()
+    add_counts(cursor, analysis_counts(rows), sign)
+
+
+def rebuild_aggregates(cursor):
+    """清空并按当前数据重新计算全部汇总（用于回填和校正）"""
+    cursor.execute('DELETE FROM report_aggregates')
+
+    for dimension, expression in ARTWORK_DIMENSIONS.items():
+        cursor.execute(f'''
+            INSERT INTO report_aggregates (dimension, key, count)
+            SELECT ?, COALESCE({expression}, ?), COUNT(*)
+            FROM artworks a
+            LEFT JOIN children c ON c.child_id = a.child_id
+            GROUP BY 2
+        ''', (dimension, UNKNOWN))
+
+    add_counts(cursor, analysis_counts(cursor.execute(ANALYSIS_QUERY).fetchall()))
+
+
+class ReportAggregates:
+    """统计报告的汇总数据
+
+    报告只读取 report_aggregates 中的几百行计数，不再扫描全部作品和图片。
+    """
+
+    def __init__(self, db_path='artwork_database.db'):
+        self.db_path = db_path
+        create_database(db_path)
+        self.db = get_database(db_path)
+
+    def rebuild(self):
+        self.db.write(lambda conn: rebuild_aggregates(conn.cursor()))
+
+    def get_report(self):
+        """返回 {维度: {键: 计数}}；education_base_color 的键为 (教育环境, 基础色彩)"""
+        _, rows = self.db.query('SELECT dimension, key, count FROM report_aggregates')
+
+        # 升级前的数据库还没有汇总数据时自动回填一次
+        if not rows:
+            _, exists = self.db.query('SELECT EXISTS (SELECT 1 FROM artworks)')
+            if exists[0][0]:
+                self.rebuild()
+                _, rows = self.db.query('SELECT dimension, key, count FROM report_aggregates')
+
+        report = {}
+        for dimension, key, count in rows:
+            if dimension == 'education_base_color':
+                key = tuple(json.loads(key))
+            report.setdefault(dimension, {})[key] = count
+        return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="统计报告汇总数据")
+    parser.add_argument('command', choices=['rebuild'], help="rebuild: 按当前数据重新计算汇总")
+    parser.add_argument('--db', default='artwork_database.db', help="数据库路径")
+    args = parser.parse_args()
+
+    aggregates = ReportAggregates(args.db)
+    aggregates.rebuild()
+    report = aggregates.get_report()
+    print(f"汇总完成: 作品 {report.get('total', {}).get('', 0)} 件, "
+          f"已分析 {report.get('analyzed', {}).get('', 0)} 件")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,203 @@
+import time
+import json
+import argparse
+import threading
+import numpy as np
+from color_analyzer import ColorAnalyzer, hex_to_rgb_array
+from database_setup import create_database
+from db_connection import get_database
+from canonical_arrays import load_canonical_array
+
+
+def encode_palette(dominant_colors):
+    """将 [(hex, percentage), ...] 编码为 float32 二进制（每行 R, G, B, 比例）"""
+    colors = [color for color, _ in dominant_colors]
+    palette = np.column_stack([
+        hex_to_rgb_array(colors),
+        [percentage for _, percentage in dominant_colors]
+    ]).astype(np.float32)
+    return palette.tobytes()
+
+
+def decode_palette(blob):
+    """解码调色板为 [(hex, percentage), ...]"""
+    palette = np.frombuffer(blob, dtype=np.float32).reshape(-1, 4)
+    return [
+        ('#%02x%02x%02x' % tuple(int(v) for v in row[:3]), float(row[3]))
+        for row in palette
+    ]
+
+
+def encode_embedding(embedding):
+    return np.asarray(embedding, dtype=np.float32).tobytes()
+
+
+def decode_embedding(blob):
+    return np.frombuffer(blob, dtype=np.float32)
+
+
+def write_embedding(cursor, artwork_id, image_hash, dominant_colors, embedding):
+    """在写事务中保存作品的调色板和直方图嵌入（替换旧值）"""
+    cursor.execute('DELETE FROM color_embeddings WHERE artwork_id = ?', (artwork_id,))
+    if embedding is None:
+        return
+    cursor.execute('''
+        INSERT INTO color_embeddings (artwork_id, image_hash, palette, histogram)
+        VALUES (?, ?, ?, ?)
+    ''', (artwork_id, image_hash, encode_palette(dominant_colors), encode_embedding(embedding)))
+
+
+class SimilarityIndex:
+    """按色彩直方图嵌入检索相似作品
+
+    嵌入向量一次性读入内存矩阵；作品数不超过 brute_force_limit 时用
+    NumPy 向量化暴力扫描，更多时构建 BallTree。嵌入表有变化时（新增或
+    重新分析）下次查询自动重新加载。
+    """
+
+    def __init__(self, db_path='artwork_database.db', brute_force_limit=20000, leaf_size=40):
+        self.db_path = db_path
+        self.brute_force_limit = brute_force_limit
+        self.leaf_size = leaf_size
+        create_database(db_path)
+        self.db = get_database(db_path)
+        self._lock = threading.Lock()
+        self._signature = None
+        self._snapshot = None
+
+    def _load(self):
+        """读取全部嵌入，返回 (作品ID数组, 向量矩阵, 平方范数, 树或None)"""
+        with self._lock:
+            _, rows = self.db.query('SELECT COUNT(*), MAX(embedding_id) FROM color_embeddings')
+            signature = rows[0]
+            if signature == self._signature:
+                return self._snapshot
+
+            _, rows = self.db.query(
+                'SELECT artwork_id, histogram FROM color_embeddings ORDER BY artwork_id'
+            )
+            artwork_ids = np.array([row[0] for row in rows], dtype=np.int64)
+            if rows:
+                vectors = np.frombuffer(
+                    b''.join(row[1] for row in rows), dtype=np.float32
+                ).reshape(len(rows), -1)
+            else:
+                vectors = np.empty((0, 0), dtype=np.float32)
+
+            tree = None
+            if len(rows) > self.brute_force_limit:
+                from sklearn.neighbors import BallTree
+                tree = BallTree(vectors, leaf_size=self.leaf_size)
+
+            self._snapshot = (artwork_ids, vectors, (vectors ** 2).sum(axis=1), tree)
+            self._signature = signature
+            return self._snapshot
+
+    def __len__(self):
+        return len(self._load()[0])
+
+    def search(self, query, k=8, exclude_self=True):
+        """检索最相似的 k 件作品
+
+        query 为作品ID或嵌入向量。返回 [(artwork_id, similarity), ...]，
+        similarity 为直方图的Bhattacharyya系数（0-1，越大越相似）。
+        """
+        artwork_ids, vectors, squared_norms, tree = self._load()
+        if len(artwork_ids) == 0:
+            return []
+
+        exclude = None
+        if isinstance(query, (int, np.integer)):
+            position = np.searchsorted(artwork_ids, query)
+            if position == len(artwork_ids) or artwork_ids[position] != query:
+                return []
+            vector = vectors[position]
+            exclude = position if exclude_self else None
+        else:
+            vector = np.asarray(query, dtype=np.float32)
+
+        n_results = min(k + (exclude is not None), len(artwork_ids))
+        if tree is not None:
+            distances, positions = tree.query(vector[None, :], k=n_results)
+            squared = distances[0] ** 2
+            positions = positions[0]
+        else:
+            # |v - q|² = |v|² - 2 v·q + |q|²
+            squared = squared_norms - 2 * (vectors @ vector) + np.dot(vector, vector)
+            positions = np.argpartition(squared, n_results - 1)[:n_results]
+            positions = positions[np.argsort(squared[positions])]
+            squared = squared[positions]
+
+        results = []
+        for position, distance in zip(positions, squared):
+            if position == exclude:
+                continue
+            # 单位向量间 |v - q|² = 2 - 2 v·q
+            similarity = float(np.clip(1 - distance / 2, 0, 1))
+            results.append((int(artwork_ids[position]), similarity))
+        return results[:k]
+
+
+def backfill_embeddings(db_path='artwork_database.db', analyzer=None):
+    """为已有分析结果但缺少嵌入的作品补算嵌入，返回 (成功数, 失败列表)"""
+    create_database(db_path)
+    db = get_database(db_path)
+    analyzer = analyzer or ColorAnalyzer()
+
+    _, rows = db.query('''
+        SELECT ca.artwork_id, ca.image_hash, ca.dominant_colors, a.image_path
+        FROM color_analysis ca
+        JOIN artworks a ON a.artwork_id = ca.artwork_id
+        LEFT JOIN color_embeddings ce ON ce.artwork_id = ca.artwork_id
+        WHERE ce.artwork_id IS NULL OR ce.image_hash IS NOT ca.image_hash
+    ''')
+
+    records = []
+    errors = []
+    for artwork_id, image_hash, dominant_colors, image_path in rows:
+        try:
+            array = load_canonical_array(image_hash)
+            embedding = analyzer.color_embedding(array if array is not None else image_path)
+            records.append((artwork_id, image_hash, json.loads(dominant_colors), embedding))
+        except Exception as e:
+            errors.append((artwork_id, str(e)))
+
+    def write(conn):
+        cursor = conn.cursor()
+        for record in records:
+            write_embedding(cursor, *record)
+
+    db.write(write)
+    return len(records), errors
+
+
+def main():
+    parser = argparse.ArgumentParser(description="相似作品检索")
+    parser.add_argument('--db', default='artwork_database.db', help="数据库路径")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    subparsers.add_parser('backfill', help="为已分析的作品补算色彩嵌入")
+
+    search = subparsers.add_parser('search', help="检索与指定作品相似的作品")
+    search.add_argument('artwork_id', type=int, help="作品ID")
+    search.add_argument('-k', type=int, default=8, help="返回结果数")
+    args = parser.parse_args()
+
+    if args.command == 'backfill':
+        created, errors = backfill_embeddings(args.db)
+        print(f"补算嵌入 {created} 件, 失败 {len(errors)} 件")
+        for artwork_id, error in errors:
+            print(f"  作品 #{artwork_id}: {error}")
+    elif args.command == 'search':
+        index = SimilarityIndex(args.db)
+        total = len(index)  # 先加载嵌入，计时只包含检索
+        start = time.perf_counter()
+        results = index.search(args.artwork_id, k=args.k)
+        elapsed = (time.perf_counter() - start) * 1000
+        for artwork_id, similarity in results:
+            print(f"作品 #{artwork_id}: 相似度 {similarity:.3f}")
+        print(f"共 {total} 件作品, 用时 {elapsed:.1f} 毫秒")
+
+
+if __name__ == "__main__":
+    main()